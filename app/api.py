@@ -1,14 +1,34 @@
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import functools
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime, timedelta
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from .config import get_google_credentials_path
-from .db import store_event, get_all_events
+from .db import store_events_bulk, get_all_events, record_sync
 
 logger = logging.getLogger(__name__)
 
+# Calendar API limits: events.list page size and requests per batch call
+MAX_RESULTS_PER_PAGE = 2500
+MAX_BATCH_REQUESTS = 50
+
+# Events written to the local database per transaction during sync
+SYNC_BATCH_SIZE = 500
+
+# Google Calendar API scopes
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+@functools.lru_cache(maxsize=1)
+def _load_credentials(credentials_path: str) -> service_account.Credentials:
+    """Load service account credentials once per credentials file."""
+    return service_account.Credentials.from_service_account_file(
+        credentials_path, scopes=SCOPES
+    )
+
 class GoogleCalendarAPI:
     def __init__(self):
         self.service = None
@@ -22,21 +42,22 @@ class GoogleCalendarAPI:
             if not credentials_path:
                 raise ValueError("Google credentials path not configured")
             
-            # Define the scopes
-            SCOPES = ['https://www.googleapis.com/auth/calendar']
-            
             # Load service account credentials
-            credentials = service_account.Credentials.from_service_account_file(
-                credentials_path, scopes=SCOPES
-            )
+            credentials = _load_credentials(credentials_path)
             
-            # Build the service
-            self.service = build('calendar', 'v3', credentials=credentials)
+            # Build the service from the discovery document bundled with the
+            # client library instead of fetching it over the network
+            self.service = build(
+                'calendar', 'v3',
+                credentials=credentials,
+                static_discovery=True,
+                cache_discovery=False
+            )
             
             logger.info("Google Calendar API service initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize Google Calendar API: {e}")
+            logger.error("Failed to initialize Google Calendar API: %s", e)
             raise
     
     def add_event(self, event_data: Dict) -> Optional[str]:
@@ -60,59 +81,115 @@ class GoogleCalendarAPI:
             ).execute()
             
             event_id = event.get('id')
-            logger.info(f"Event created successfully: {event_id}")
+            logger.info("Event created successfully: %s", event_id)
             return event_id
             
         except HttpError as e:
-            logger.error(f"HTTP error adding event to calendar: {e}")
+            logger.error("HTTP error adding event to calendar: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Error adding event to calendar: {e}")
+            logger.error("Error adding event to calendar: %s", e)
             return None
     
-    def get_events(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+    def add_events_batch(self, events: List[Dict]) -> List[Optional[str]]:
         """
-        Fetch events from Google Calendar within date range.
+        Add several events to Google Calendar using batched HTTP requests.
+        
+        Args:
+            events: List of event dictionaries
+            
+        Returns:
+            Google Calendar event IDs in input order (None for failures)
+        """
+        event_ids: List[Optional[str]] = [None] * len(events)
+        
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                logger.error("Error adding event %s in batch: %s", request_id, exception)
+                return
+            event_ids[int(request_id)] = response.get('id')
+        
+        try:
+            for offset in range(0, len(events), MAX_BATCH_REQUESTS):
+                batch = self.service.new_batch_http_request(callback=_callback)
+                for index in range(offset, min(offset + MAX_BATCH_REQUESTS, len(events))):
+                    batch.add(
+                        self.service.events().insert(
+                            calendarId=self.calendar_id,
+                            body=self._convert_to_calendar_event(events[index])
+                        ),
+                        request_id=str(index)
+                    )
+                batch.execute()
+            
+            logger.info("Batch created %s of %s events", sum(1 for i in event_ids if i), len(events))
+            
+        except HttpError as e:
+            logger.error("HTTP error adding events in batch: %s", e)
+        except Exception as e:
+            logger.error("Error adding events in batch: %s", e)
+        
+        return event_ids
+    
+    def iter_events(self, start_date: datetime, end_date: datetime) -> Iterator[Dict]:
+        """
+        Stream events from Google Calendar within date range, page by page.
         
         Args:
             start_date: Start datetime for event range
             end_date: End datetime for event range
             
-        Returns:
-            List of event dictionaries
+        Yields:
+            Event dictionaries as each page of results arrives
         """
         try:
             # Format datetime for Google Calendar API
             time_min = start_date.isoformat() + 'Z'
             time_max = end_date.isoformat() + 'Z'
             
-            # Call the Calendar API
-            events_result = self.service.events().list(
-                calendarId=self.calendar_id,
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            
-            # Convert to our event format
-            converted_events = []
-            for event in events:
-                converted_event = self._convert_from_calendar_event(event)
-                if converted_event:
-                    converted_events.append(converted_event)
-            
-            logger.info(f"Fetched {len(converted_events)} events from Google Calendar")
-            return converted_events
+            # Call the Calendar API, following pagination with the largest
+            # page size so long ranges take as few round trips as possible
+            page_token = None
+            while True:
+                events_result = self.service.events().list(
+                    calendarId=self.calendar_id,
+                    timeMin=time_min,
+                    timeMax=time_max,
+                    singleEvents=True,
+                    orderBy='startTime',
+                    maxResults=MAX_RESULTS_PER_PAGE,
+                    pageToken=page_token
+                ).execute()
+                
+                # Convert to our event format
+                for event in events_result.get('items', []):
+                    converted_event = self._convert_from_calendar_event(event)
+                    if converted_event:
+                        yield converted_event
+                
+                page_token = events_result.get('nextPageToken')
+                if not page_token:
+                    break
             
         except HttpError as e:
-            logger.error(f"HTTP error fetching events: {e}")
-            return []
+            logger.error("HTTP error fetching events: %s", e)
         except Exception as e:
-            logger.error(f"Error fetching events from calendar: {e}")
-            return []
+            logger.error("Error fetching events from calendar: %s", e)
+    
+    def get_events(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """
+        Fetch events from Google Calendar within date range.
+        
+        Args:
+            start_date: Start datetime for event range
+            end_date: End datetime for event range
+            
+        Returns:
+            List of event dictionaries
+        """
+        converted_events = list(self.iter_events(start_date, end_date))
+        logger.info("Fetched %s events from Google Calendar", len(converted_events))
+        return converted_events
     
     def update_event(self, event_id: str, event_data: Dict) -> bool:
         """
@@ -136,14 +213,14 @@ class GoogleCalendarAPI:
                 body=calendar_event
             ).execute()
             
-            logger.info(f"Event updated successfully: {event_id}")
+            logger.info("Event updated successfully: %s", event_id)
             return True
             
         except HttpError as e:
-            logger.error(f"HTTP error updating event: {e}")
+            logger.error("HTTP error updating event: %s", e)
             return False
         except Exception as e:
-            logger.error(f"Error updating event: {e}")
+            logger.error("Error updating event: %s", e)
             return False
     
     def delete_event(self, event_id: str) -> bool:
@@ -162,14 +239,14 @@ class GoogleCalendarAPI:
                 eventId=event_id
             ).execute()
             
-            logger.info(f"Event deleted successfully: {event_id}")
+            logger.info("Event deleted successfully: %s", event_id)
             return True
             
         except HttpError as e:
-            logger.error(f"HTTP error deleting event: {e}")
+            logger.error("HTTP error deleting event: %s", e)
             return False
         except Exception as e:
-            logger.error(f"Error deleting event: {e}")
+            logger.error("Error deleting event: %s", e)
             return False
     
     def _convert_to_calendar_event(self, event_data: Dict) -> Dict:
@@ -211,7 +288,7 @@ class GoogleCalendarAPI:
             end_datetime = end.get('dateTime') or end.get('date')
             
             if not start_datetime or not end_datetime:
-                logger.warning(f"Missing datetime in event: {calendar_event.get('id')}")
+                logger.warning("Missing datetime in event: %s", calendar_event.get('id'))
                 return None
             
             # Extract attendees
@@ -235,7 +312,7 @@ class GoogleCalendarAPI:
             return event_data
             
         except Exception as e:
-            logger.error(f"Error converting calendar event: {e}")
+            logger.error("Error converting calendar event: %s", e)
             return None
 
 # Global API instance
@@ -262,7 +339,7 @@ def add_event_to_calendar(event_data: Dict) -> Optional[str]:
         api = get_calendar_api()
         return api.add_event(event_data)
     except Exception as e:
-        logger.error(f"Error adding event to calendar: {e}")
+        logger.error("Error adding event to calendar: %s", e)
         return None
 
 def sync_calendar_events(days_ahead: int = 30) -> int:
@@ -282,26 +359,51 @@ def sync_calendar_events(days_ahead: int = 30) -> int:
         start_date = datetime.now()
         end_date = start_date + timedelta(days=days_ahead)
         
-        # Fetch events from Google Calendar
-        calendar_events = api.get_events(start_date, end_date)
+        # Stream events from Google Calendar and store/update them in
+        # batches, so memory stays bounded by the batch size
+        calendar_events = api.iter_events(start_date, end_date)
         
         events_synced = 0
-        for event in calendar_events:
-            try:
-                # Store/update event in local database
-                store_event(event, sync=True)
-                events_synced += 1
-            except Exception as e:
-                logger.error(f"Error storing synced event: {e}")
-                continue
+        failed_events: List[Dict] = []
+        while True:
+            batch = list(islice(calendar_events, SYNC_BATCH_SIZE))
+            if not batch:
+                break
+            events_synced += store_events_bulk(batch, sync=True, errors=failed_events)
+        
+        if failed_events:
+            logger.error(
+                "Failed to store %s synced events: %s",
+                len(failed_events),
+                [event.get('calendar_event_id') for event in failed_events]
+            )
+        
+        # One write marks the whole run as synced, so unchanged events need
+        # no per-row update
+        record_sync(start_date.isoformat())
         
-        logger.info(f"Synced {events_synced} events from Google Calendar")
+        logger.info("Synced %s events from Google Calendar", events_synced)
         return events_synced
         
     except Exception as e:
-        logger.error(f"Error syncing calendar events: {e}")
+        logger.error("Error syncing calendar events: %s", e)
         return 0
 
+async def sync_calendar_events_async(days_ahead: int = 30) -> int:
+    """
+    Sync events without blocking the event loop.
+    
+    The Google API client and SQLite are both blocking, so the sync runs in
+    a worker thread while the loop keeps serving other requests.
+    
+    Args:
+        days_ahead: Number of days ahead to sync
+        
+    Returns:
+        Number of events synced
+    """
+    return await asyncio.to_thread(sync_calendar_events, days_ahead)
+
 def get_calendar_events_in_range(start_date: datetime, end_date: datetime) -> List[Dict]:
     """
     Get events from Google Calendar within date range.
@@ -313,5 +415,5 @@ def get_calendar_events_in_range(start_date: datetime, end_date: datetime) -> Li
         api = get_calendar_api()
         return api.get_events(start_date, end_date)
     except Exception as e:
-        logger.error(f"Error fetching calendar events: {e}")
+        logger.error("Error fetching calendar events: %s", e)
         return [] 
\ No newline at end of file
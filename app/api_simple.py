@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
@@ -45,6 +46,13 @@ def sync_calendar_events(days_ahead: int = 30) -> int:
         logger.error(f"Mock: Error syncing calendar events: {e}")
         return 0
 
+async def sync_calendar_events_async(days_ahead: int = 30) -> int:
+    """
+    Mock async variant of sync_calendar_events.
+    Runs the sync in a worker thread like the real implementation.
+    """
+    return await asyncio.to_thread(sync_calendar_events, days_ahead)
+
 def get_calendar_events_in_range(start_date: datetime, end_date: datetime) -> List[Dict]:
     """
     Mock function to simulate fetching events from Google Calendar.
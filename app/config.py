@@ -1,21 +1,40 @@
 import os
 import json
 import logging
+import functools
 from pathlib import Path
 from typing import Optional, Dict
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Configuration file paths
 CONFIG_DIR = Path(__file__).parent.parent / "config"
 USER_CONFIG_FILE = CONFIG_DIR / "user_config.json"
 
+# Default model for event parsing; JSON extraction only needs a small
+# instruction-tuned model
+DEFAULT_LLM_MODEL = "microsoft/Phi-3-mini-4k-instruct"
+
+# Last loaded config, invalidated when the file's mtime changes
+_CACHE = {"mtime": None, "data": None}
+
 def load_config() -> Dict:
     """Load user configuration from file."""
     try:
         if USER_CONFIG_FILE.exists():
-            with open(USER_CONFIG_FILE, 'r') as f:
-                config = json.load(f)
+            st = USER_CONFIG_FILE.stat()
+            if _CACHE["mtime"] == st.st_mtime_ns:
+                return _CACHE["data"]
+            
+            with open(USER_CONFIG_FILE, 'rb') as f:
+                config = orjson.loads(f.read()) if orjson else json.load(f)
+                _CACHE["mtime"] = st.st_mtime_ns
+                _CACHE["data"] = config
                 logger.info("User configuration loaded successfully")
                 return config
         else:
@@ -29,19 +48,25 @@ def load_config() -> Dict:
             save_config(default_config)
             return default_config
     except Exception as e:
-        logger.error(f"Error loading configuration: {e}")
+        logger.error("Error loading configuration: %s", e)
         return {}
 
 def save_config(config: Dict) -> bool:
     """Save user configuration to file."""
     try:
         CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        with open(USER_CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
+        if orjson:
+            with open(USER_CONFIG_FILE, 'wb') as f:
+                f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+        else:
+            with open(USER_CONFIG_FILE, 'w') as f:
+                json.dump(config, f, indent=2)
+        _CACHE["mtime"] = USER_CONFIG_FILE.stat().st_mtime_ns
+        _CACHE["data"] = config
         logger.info("User configuration saved successfully")
         return True
     except Exception as e:
-        logger.error(f"Error saving configuration: {e}")
+        logger.error("Error saving configuration: %s", e)
         return False
 
 def get_huggingface_token() -> Optional[str]:
@@ -51,13 +76,22 @@ def get_huggingface_token() -> Optional[str]:
         logger.warning("HUGGINGFACE_API_TOKEN environment variable not set")
     return token
 
+def get_llm_endpoint_url() -> Optional[str]:
+    """Get a self-hosted text-generation-inference endpoint, if configured."""
+    return os.getenv('LLM_ENDPOINT_URL') or None
+
+def get_llm_model() -> str:
+    """Get the Hugging Face model used for event parsing."""
+    return os.getenv('LLM_MODEL', DEFAULT_LLM_MODEL)
+
+@functools.lru_cache(maxsize=1)
 def get_google_credentials_path() -> Optional[str]:
-    """Get Google Calendar credentials file path."""
+    """Get Google Calendar credentials file path (cached for the process)."""
     creds_path = os.getenv('GOOGLE_CREDENTIALS_PATH', 'config/credentials.json')
     
     # Check if file exists
     if not os.path.exists(creds_path):
-        logger.warning(f"Google credentials file not found: {creds_path}")
+        logger.warning("Google credentials file not found: %s", creds_path)
         return None
     
     return creds_path
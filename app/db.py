@@ -1,25 +1,193 @@
+import asyncio
 import sqlite3
 import logging
 import json
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+import functools
+import hashlib
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime, timezone, tzinfo
 from pathlib import Path
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from .config import get_timezone
+from .timeparse import DateTimeLike, parse_iso
+
+try:
+    import orjson
+    
+    def _json_dumps(value) -> str:
+        return orjson.dumps(value).decode()
+    
+    _json_loads = orjson.loads
+except ImportError:  # orjson is an optional speedup
+    _json_dumps = json.dumps
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
 # Database file path
 DB_PATH = Path(__file__).parent.parent / "data" / "calendar.sqlite"
+_DB_PATH_STR = str(DB_PATH)
+
+# Epoch-second columns derived from the ISO timestamps. SQLite reads naive
+# values as UTC, so naive event times are stored with the user's offset
+_GENERATED_COLUMNS = {
+    'start_ts': "CAST(strftime('%s', start_datetime) AS INTEGER)",
+    'end_ts': "CAST(strftime('%s', end_datetime) AS INTEGER)",
+}
+
+# Set once init_db has created the schema in this process
+_initialized = False
+
+# Columns returned by get_events, in SELECT order
+EVENT_COLUMNS = (
+    'id', 'title', 'start_datetime', 'end_datetime', 'description',
+    'location', 'attendees', 'calendar_event_id', 'created_at',
+    'updated_at', 'synced_at'
+)
+
+# Insert-or-update keyed on the Google Calendar event ID; rows whose
+# content hash is unchanged are left untouched
+_UPSERT_SQL = '''
+    INSERT INTO events (
+        title, start_datetime, end_datetime, description,
+        location, attendees, calendar_event_id, created_at,
+        updated_at, synced_at, content_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(calendar_event_id) DO UPDATE SET
+        title = excluded.title,
+        start_datetime = excluded.start_datetime,
+        end_datetime = excluded.end_datetime,
+        description = excluded.description,
+        location = excluded.location,
+        attendees = excluded.attendees,
+        updated_at = excluded.updated_at,
+        synced_at = excluded.synced_at,
+        content_hash = excluded.content_hash
+    WHERE events.content_hash IS NOT excluded.content_hash
+'''
+
+# Single-row record of the last completed calendar sync; unchanged events
+# aren't rewritten, so their own synced_at only tracks their last change
+_RECORD_SYNC_SQL = '''
+    INSERT INTO sync_state (id, last_synced_at) VALUES (1, ?)
+    ON CONFLICT(id) DO UPDATE SET last_synced_at = excluded.last_synced_at
+'''
+
+# One connection per thread, reused across calls
+_local = threading.local()
+
+def _conn() -> sqlite3.Connection:
+    """Get this thread's database connection, opening it on first use."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(_DB_PATH_STR, isolation_level=None, check_same_thread=False)
+        conn.executescript('''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-20000;
+        ''')
+        _local.conn = conn
+    return conn
+
+@functools.lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO 8601 string, memoized since the same timestamps recur."""
+    return parse_iso(value)
+
+@functools.lru_cache(maxsize=32)
+def _get_tz(name: str) -> tzinfo:
+    """Look up a timezone once per name, falling back to UTC if unknown."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning("Unknown timezone %s, treating naive times as UTC", name)
+        return timezone.utc
+
+def _user_tz() -> tzinfo:
+    """Timezone of naive event times; the parsers emit the user's local time."""
+    return _get_tz(get_timezone())
+
+def _to_epoch(value: datetime, tz: tzinfo) -> int:
+    """Convert a datetime to epoch seconds, reading naive values in ``tz``."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=tz)
+    return int(value.timestamp())
+
+def _with_offset(value: str, tz: tzinfo) -> str:
+    """Add the ``tz`` offset to a naive ISO datetime so SQLite converts it correctly."""
+    # Date-only values of all-day events are kept as they are
+    if len(value) <= 10:
+        return value
+    try:
+        parsed = _parse_iso(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        return value
+    return parsed.replace(tzinfo=tz).isoformat()
+
+def _event_row(event_data: Dict, current_time: str,
+               synced_at: Optional[str], tz: tzinfo) -> tuple:
+    """Build the _UPSERT_SQL parameter tuple for an event."""
+    title = event_data['title']
+    start_datetime = _with_offset(event_data['start_datetime'], tz)
+    end_datetime = _with_offset(event_data['end_datetime'], tz)
+    description = event_data.get('description', '')
+    location = event_data.get('location', '')
+    attendees_json = _json_dumps(event_data.get('attendees', []))
+    
+    # Digest of the user-visible fields, used to skip no-op rewrites
+    content = '\x1f'.join((
+        title, start_datetime, end_datetime,
+        description or '', location or '', attendees_json
+    ))
+    content_hash = hashlib.blake2b(content.encode(), digest_size=8).digest()
+    
+    return (
+        title, start_datetime, end_datetime, description, location,
+        attendees_json, event_data.get('calendar_event_id'),
+        current_time, current_time, synced_at, content_hash
+    )
+
+# Event bounds may be ISO strings or datetimes the parser already produced
+def _as_datetime(value: DateTimeLike) -> datetime:
+    """Return a datetime, parsing ISO strings and passing datetimes through."""
+    return value if isinstance(value, datetime) else _parse_iso(value)
+
+def _buffer_window(start_datetime: DateTimeLike, end_datetime: DateTimeLike,
+                   gap_minutes: int) -> Tuple[int, int]:
+    """Epoch-second bounds of an event window padded by ``gap_minutes``."""
+    gap_seconds = gap_minutes * 60
+    tz = _user_tz()
+    return (
+        _to_epoch(_as_datetime(start_datetime), tz) - gap_seconds,
+        _to_epoch(_as_datetime(end_datetime), tz) + gap_seconds
+    )
 
 def init_db():
     """Initialize the database with required tables."""
+    global _initialized
+    if _initialized:
+        return
+    
     try:
         # Ensure data directory exists
         data_dir = Path(DB_PATH).parent
         data_dir.mkdir(parents=True, exist_ok=True)
         
-        with sqlite3.connect(DB_PATH) as conn:
+        conn = _conn()
+        with conn:
             cursor = conn.cursor()
             
+            # The connection autocommits, so the schema changes and the
+            # migrations below run in one explicit transaction; a failure
+            # rolls back instead of leaving the indexes half migrated
+            cursor.execute('BEGIN')
+            
             # Create events table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS events (
@@ -34,7 +202,53 @@ def init_db():
                     created_at TEXT NOT NULL,
                     updated_at TEXT NOT NULL,
                     synced_at TEXT,
-                    is_deleted INTEGER DEFAULT 0
+                    is_deleted INTEGER DEFAULT 0,
+                    content_hash BLOB,
+                    start_ts INTEGER GENERATED ALWAYS AS ({start_ts}) VIRTUAL,
+                    end_ts INTEGER GENERATED ALWAYS AS ({end_ts}) VIRTUAL
+                )
+            '''.format(**_GENERATED_COLUMNS))
+            
+            # Add columns missing from databases created by older versions
+            cursor.execute('PRAGMA table_xinfo(events)')
+            existing_columns = {row[1] for row in cursor.fetchall()}
+            if 'content_hash' not in existing_columns:
+                cursor.execute('ALTER TABLE events ADD COLUMN content_hash BLOB')
+            for name, expression in _GENERATED_COLUMNS.items():
+                if name not in existing_columns:
+                    cursor.execute(
+                        f'ALTER TABLE events ADD COLUMN {name} INTEGER '
+                        f'GENERATED ALWAYS AS ({expression}) VIRTUAL'
+                    )
+            
+            # Older versions stored naive local times, which the ts columns
+            # read as UTC; give them the user's offset
+            tz = _user_tz()
+            cursor.execute('''
+                SELECT id, start_datetime, end_datetime FROM events
+                WHERE (length(start_datetime) > 10
+                       AND substr(start_datetime, -6, 1) NOT IN ('+', '-')
+                       AND start_datetime NOT LIKE '%Z')
+                OR (length(end_datetime) > 10
+                    AND substr(end_datetime, -6, 1) NOT IN ('+', '-')
+                    AND end_datetime NOT LIKE '%Z')
+            ''')
+            naive_rows = [
+                (_with_offset(start, tz), _with_offset(end, tz), event_id)
+                for event_id, start, end in cursor.fetchall()
+            ]
+            if naive_rows:
+                cursor.executemany(
+                    'UPDATE events SET start_datetime = ?, end_datetime = ? WHERE id = ?',
+                    naive_rows
+                )
+                logger.info("Added timezone offsets to %s stored events", len(naive_rows))
+            
+            # Time of the last completed calendar sync
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    last_synced_at TEXT NOT NULL
                 )
             ''')
             
@@ -44,97 +258,162 @@ def init_db():
                 ON events(start_datetime, end_datetime)
             ''')
             
+            # Conflict checks compare integer epochs instead of ISO strings
+            cursor.execute('DROP INDEX IF EXISTS idx_events_active_start')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_events_ts
+                ON events(start_ts, end_ts)
+                WHERE is_deleted = 0
+            ''')
+            
+            # Unique so synced events can be upserted by calendar_event_id.
+            # Older versions allowed duplicate IDs; only the newest row of
+            # each is kept, otherwise the unique index can't be created
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_events_calendar_id 
+                DELETE FROM events
+                WHERE calendar_event_id IS NOT NULL
+                AND id NOT IN (
+                    SELECT MAX(id) FROM events
+                    WHERE calendar_event_id IS NOT NULL
+                    GROUP BY calendar_event_id
+                )
+            ''')
+            if cursor.rowcount > 0:
+                logger.warning(
+                    "Removed %s duplicate synced events before creating the unique index",
+                    cursor.rowcount
+                )
+            cursor.execute('DROP INDEX IF EXISTS idx_events_calendar_id')
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_events_calendar_event_id
                 ON events(calendar_event_id)
             ''')
             
-            conn.commit()
             logger.info("Database initialized successfully")
+        
+        _initialized = True
             
     except sqlite3.Error as e:
-        logger.error(f"Database initialization error: {e}")
+        logger.error("Database initialization error: %s", e)
         raise
 
 def store_event(event_data: Dict, sync: bool = False) -> Optional[int]:
-    """Store an event in the database."""
+    """Store an event in the database, updating it if already synced."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            
+        conn = _conn()
+        with conn:
             current_time = datetime.now().isoformat()
-            attendees_json = json.dumps(event_data.get('attendees', []))
+            row = _event_row(
+                event_data, current_time, current_time if sync else None, _user_tz()
+            )
+            
+            cursor = conn.execute(_UPSERT_SQL, row)
             
-            if sync and event_data.get('calendar_event_id'):
-                # Check if event already exists
-                cursor.execute(
+            # RETURNING needs SQLite 3.35, so the id is looked up instead.
+            # Without a calendar ID there is no conflict, so it was an insert;
+            # otherwise the row may have been updated or skipped, which
+            # lastrowid doesn't report
+            calendar_event_id = event_data.get('calendar_event_id')
+            if calendar_event_id is None:
+                event_id = cursor.lastrowid
+            else:
+                event_id = conn.execute(
                     'SELECT id FROM events WHERE calendar_event_id = ?',
-                    (event_data['calendar_event_id'],)
-                )
-                existing = cursor.fetchone()
-                
-                if existing:
-                    # Update existing event
-                    cursor.execute('''
-                        UPDATE events SET
-                            title = ?, start_datetime = ?, end_datetime = ?,
-                            description = ?, location = ?, attendees = ?,
-                            updated_at = ?, synced_at = ?
-                        WHERE calendar_event_id = ?
-                    ''', (
-                        event_data['title'],
-                        event_data['start_datetime'],
-                        event_data['end_datetime'],
-                        event_data.get('description', ''),
-                        event_data.get('location', ''),
-                        attendees_json,
-                        current_time,
-                        current_time,
-                        event_data['calendar_event_id']
-                    ))
-                    conn.commit()
-                    return existing[0]
-            
-            # Insert new event
-            cursor.execute('''
-                INSERT INTO events (
-                    title, start_datetime, end_datetime, description,
-                    location, attendees, calendar_event_id, created_at,
-                    updated_at, synced_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                event_data['title'],
-                event_data['start_datetime'],
-                event_data['end_datetime'],
-                event_data.get('description', ''),
-                event_data.get('location', ''),
-                attendees_json,
-                event_data.get('calendar_event_id'),
-                current_time,
-                current_time,
-                current_time if sync else None
-            ))
-            
-            conn.commit()
-            event_id = cursor.lastrowid
-            logger.info(f"Event stored successfully: {event_id}")
+                    (calendar_event_id,)
+                ).fetchone()[0]
+            logger.info("Event stored successfully: %s", event_id)
             return event_id
             
     except sqlite3.Error as e:
-        logger.error(f"Database error storing event: {e}")
+        logger.error("Database error storing event: %s", e)
         return None
 
+def store_events_bulk(events: Iterable[Dict], sync: bool = True,
+                      errors: Optional[List[Dict]] = None) -> int:
+    """
+    Store many events in a single transaction, updating existing rows.
+    
+    Returns the number of events stored. Rows whose content is unchanged
+    are not rewritten, but still count as stored; the time of the sync as
+    a whole is kept by ``record_sync``. Rows are generated lazily and
+    consumed by ``executemany`` so large backfills never hold a second,
+    tuple-shaped copy of the events. Events missing required fields are left out of the
+    batch and appended to ``errors`` when a list is given.
+    """
+    if errors is None:
+        errors = []
+    errors_before = len(errors)
+    
+    try:
+        conn = _conn()
+        with conn:
+            current_time = datetime.now().isoformat()
+            synced_at = current_time if sync else None
+            tz = _user_tz()
+            
+            stored = 0
+            
+            def rows():
+                nonlocal stored
+                for event_data in events:
+                    try:
+                        row = _event_row(event_data, current_time, synced_at, tz)
+                    except (KeyError, TypeError):
+                        errors.append(event_data)
+                        continue
+                    stored += 1
+                    yield row
+            
+            # Explicit transaction so the batch is committed once
+            conn.execute('BEGIN')
+            cursor = conn.executemany(_UPSERT_SQL, rows())
+            changed = max(cursor.rowcount, 0)
+            
+            skipped = len(errors) - errors_before
+            if skipped:
+                logger.warning("Skipped %s malformed events in bulk store", skipped)
+            logger.info("Stored %s events in bulk (%s new or changed)", stored, changed)
+            return stored
+            
+    except sqlite3.Error as e:
+        logger.error("Database error storing events in bulk: %s", e)
+        return 0
+
+def record_sync(synced_at: Optional[str] = None) -> bool:
+    """Record when the calendar was last synced, as one row per sync run."""
+    try:
+        conn = _conn()
+        with conn:
+            conn.execute(_RECORD_SYNC_SQL, (synced_at or datetime.now().isoformat(),))
+            return True
+    except sqlite3.Error as e:
+        logger.error("Database error recording sync time: %s", e)
+        return False
+
 def get_events(start_date: Optional[str] = None, 
-               end_date: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
-    """Get events from database with optional filtering."""
+               end_date: Optional[str] = None, limit: Optional[int] = None,
+               columns: Optional[Sequence[str]] = None) -> List[Dict]:
+    """
+    Get events from database with optional filtering.
+    
+    Pass ``columns`` to select a subset of fields; attendees are only
+    decoded from JSON when they are requested.
+    """
+    if columns is None:
+        columns = EVENT_COLUMNS
+    else:
+        unknown = set(columns) - set(EVENT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown event columns: {sorted(unknown)}")
+    
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        conn = _conn()
+        with conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             
-            query = '''
-                SELECT id, title, start_datetime, end_datetime, description,
-                       location, attendees, calendar_event_id, created_at,
-                       updated_at, synced_at
+            query = f'''
+                SELECT {', '.join(columns)}
                 FROM events 
                 WHERE is_deleted = 0
             '''
@@ -155,72 +434,132 @@ def get_events(start_date: Optional[str] = None,
                 params.append(limit)
             
             cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            events = []
-            for row in rows:
-                event = {
-                    'id': row[0],
-                    'title': row[1],
-                    'start_datetime': row[2],
-                    'end_datetime': row[3],
-                    'description': row[4],
-                    'location': row[5],
-                    'attendees': json.loads(row[6]) if row[6] else [],
-                    'calendar_event_id': row[7],
-                    'created_at': row[8],
-                    'updated_at': row[9],
-                    'synced_at': row[10]
-                }
-                events.append(event)
+            events = [dict(row) for row in cursor.fetchall()]
+            
+            if 'attendees' in columns:
+                for event in events:
+                    attendees = event['attendees']
+                    event['attendees'] = _json_loads(attendees) if attendees else []
             
             return events
             
     except sqlite3.Error as e:
-        logger.error(f"Database error fetching events: {e}")
+        logger.error("Database error fetching events: %s", e)
         return []
 
-def check_conflicts(start_datetime: str, end_datetime: str, 
+def check_conflicts(start_datetime: DateTimeLike, end_datetime: DateTimeLike,
                    gap_minutes: int = 15) -> List[Dict]:
     """Check for scheduling conflicts with existing events."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        conn = _conn()
+        with conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             
-            # Calculate buffer times
-            start_time = datetime.fromisoformat(start_datetime)
-            end_time = datetime.fromisoformat(end_datetime)
-            buffer_start = (start_time - timedelta(minutes=gap_minutes)).isoformat()
-            buffer_end = (end_time + timedelta(minutes=gap_minutes)).isoformat()
+            buffer_start, buffer_end = _buffer_window(
+                start_datetime, end_datetime, gap_minutes
+            )
             
+            # Half-open overlap against the buffered window; the unbuffered
+            # window is contained in it so no second predicate is needed
             cursor.execute('''
                 SELECT id, title, start_datetime, end_datetime
                 FROM events 
                 WHERE is_deleted = 0
-                AND (
-                    (start_datetime < ? AND end_datetime > ?) OR
-                    (start_datetime < ? AND end_datetime > ?)
-                )
-            ''', [buffer_end, buffer_start, end_datetime, start_datetime])
-            
-            rows = cursor.fetchall()
+                AND start_ts < :buffer_end
+                AND end_ts > :buffer_start
+            ''', {"buffer_start": buffer_start, "buffer_end": buffer_end})
             
-            conflicts = []
-            for row in rows:
-                conflict = {
-                    'id': row[0],
-                    'title': row[1],
-                    'start_datetime': row[2],
-                    'end_datetime': row[3]
-                }
-                conflicts.append(conflict)
-            
-            return conflicts
+            return [dict(row) for row in cursor.fetchall()]
             
     except sqlite3.Error as e:
-        logger.error(f"Database error checking conflicts: {e}")
+        logger.error("Database error checking conflicts: %s", e)
         return []
 
+async def check_conflicts_async(start_datetime: DateTimeLike, end_datetime: DateTimeLike,
+                                gap_minutes: int = 15) -> List[Dict]:
+    """Check for conflicts in a worker thread so the event loop isn't blocked."""
+    return await asyncio.to_thread(check_conflicts, start_datetime, end_datetime, gap_minutes)
+
+class ConflictIndex:
+    """
+    In-memory snapshot of active events for repeated conflict checks.
+    
+    Events are kept sorted by start time so each lookup is a bisect plus a
+    scan of the few events that can reach into the requested window,
+    instead of one SQL query per candidate. Fields are stored as parallel
+    columns, with epoch bounds in typed arrays, so the scan only touches
+    8-byte integers rather than per-event dicts.
+    
+    Built from ``rows`` it only holds those events; ``window`` then gives
+    the epoch-second span that ``covers`` accepts lookups for.
+    """
+    
+    def __init__(self, rows: Optional[List[Dict]] = None,
+                 window: Optional[Tuple[int, int]] = None):
+        if rows is None:
+            rows = get_events(columns=('id', 'title', 'start_datetime', 'end_datetime'))
+        self.window = window
+        tz = _user_tz()
+        spans = []
+        for row in rows:
+            try:
+                spans.append((
+                    _to_epoch(_parse_iso(row['start_datetime']), tz),
+                    _to_epoch(_parse_iso(row['end_datetime']), tz),
+                    row
+                ))
+            except ValueError as e:
+                # Skipped like the SQL check, where strftime yields NULL
+                logger.warning("Skipping event %s with invalid datetime: %s", row['id'], e)
+        spans.sort(key=lambda span: span[0])
+        self.starts = array('q', [start for start, _, _ in spans])
+        self.ends = array('q', [end for _, end, _ in spans])
+        self.ids = [row['id'] for _, _, row in spans]
+        self.titles = [row['title'] for _, _, row in spans]
+        self.start_datetimes = [row['start_datetime'] for _, _, row in spans]
+        self.end_datetimes = [row['end_datetime'] for _, _, row in spans]
+        # Longest event bounds how far back an overlapping event can start
+        self.max_duration = max((end - start for start, end, _ in spans), default=0)
+    
+    def covers(self, start_datetime: DateTimeLike, end_datetime: DateTimeLike) -> bool:
+        """Whether ``find`` sees every event that can conflict with this event."""
+        if self.window is None:
+            return True
+        start, end = _buffer_window(start_datetime, end_datetime, 0)
+        return self.window[0] <= start and end <= self.window[1]
+    
+    def find(self, start_datetime: DateTimeLike, end_datetime: DateTimeLike,
+             gap_minutes: int = 15) -> List[Dict]:
+        """Return events overlapping the window padded by ``gap_minutes``."""
+        buffer_start, buffer_end = _buffer_window(
+            start_datetime, end_datetime, gap_minutes
+        )
+        
+        lo = bisect_right(self.starts, buffer_start - self.max_duration)
+        hi = bisect_left(self.starts, buffer_end)
+        ends = self.ends
+        return [
+            {
+                'id': self.ids[i],
+                'title': self.titles[i],
+                'start_datetime': self.start_datetimes[i],
+                'end_datetime': self.end_datetimes[i]
+            }
+            for i in range(lo, hi) if ends[i] > buffer_start
+        ]
+
+def load_conflict_window(window_start: DateTimeLike, window_end: DateTimeLike,
+                         gap_minutes: int = 15) -> ConflictIndex:
+    """
+    Load every event that can conflict with an event inside the window.
+    
+    Lets callers fetch conflict candidates before the exact event time is
+    known; ``covers`` tells whether a later event fell inside the window.
+    """
+    rows = check_conflicts(window_start, window_end, gap_minutes)
+    return ConflictIndex(rows, _buffer_window(window_start, window_end, 0))
+
 def get_all_events() -> List[Dict]:
     """Get all events from database."""
     return get_events() 
\ No newline at end of file
@@ -0,0 +1,221 @@
+import re
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Confidence above which a fast-path parse is used without calling the LLM
+FAST_PATH_THRESHOLD = 0.85
+
+# Phrasings the fast path can't resolve on its own (recurrence, relative
+# offsets, alternatives, time ranges such as "4-5pm", decimal times,
+# calendar dates, other timezones); these always go to the LLM
+_AMBIGUOUS_RE = re.compile(
+    r"\b(every|each|daily|weekly|monthly|until|between|or|except|this|next|"
+    r"last|from|to|till|before|after|around|about|tonight|morning|afternoon|"
+    r"evening)\b|\?|\d\s*[-\u2013]\s*\d|\d\.\d"
+    # Offsets such as "in 2 days" or "in two weeks"
+    r"|\bin\s+(?:\d+|an?|one|two|three|four|five|six|seven|eight|nine|ten|"
+    r"few|couple|several|half)\b"
+    # Calendar dates: month names, ordinals ("3rd", "the 20th"), "12/3"
+    r"|\b(?:january|february|march|april|may|june|july|august|september|"
+    r"october|november|december|jan|feb|mar|apr|jun|jul|aug|sept?|oct|nov|"
+    r"dec)\b|\b\d+(?:st|nd|rd|th)\b|\d/\d"
+    # Day words _DAY_RE doesn't resolve: abbreviations, misspellings, spans
+    r"|\b(?:yesterday|tmrw?|tmw|tomo|tomorow|tommorr?ow|2morr?ow|2moro|mon|tues?|"
+    r"weds?|thu|thurs?|fri|sat|sun|weekend|fortnight|days?|weeks?|months?|"
+    r"years?)\b"
+    # Timezones; the fast path always resolves times in the user's own
+    r"|\b(?:utc|gmt|pst|pdt|pt|est|edt|et|cst|cdt|ct|mst|mdt|mt|akst|akdt|"
+    r"hst|bst|cet|cest|eet|eest|ist|jst|kst|aest|aedt|acst|awst|"
+    r"nzst|nzdt|pacific|eastern|central|mountain)\b",
+    re.IGNORECASE
+)
+
+# A clock time directly after another number ("12-1pm", "1.5pm") is only
+# part of a larger expression
+_TIME_PREFIX_RE = re.compile(r"[\d.:][-\u2013]?\s*$")
+
+_DAY_RE = re.compile(
+    r"\b(?:on\s+)?(?P<day>today|tomorrow|monday|tuesday|wednesday|thursday|"
+    r"friday|saturday|sunday)\b",
+    re.IGNORECASE
+)
+
+_TIME_RE = re.compile(
+    r"\b(?:at\s+)?(?:(?P<hour>1[0-2]|0?[1-9])(?::(?P<minute>[0-5]\d))?\s*(?P<ampm>[ap])\.?m\b\.?"
+    r"|(?P<hour24>[01]?\d|2[0-3]):(?P<minute24>[0-5]\d)\b"
+    r"|(?P<named>noon|midnight)\b)",
+    re.IGNORECASE
+)
+
+_DURATION_RE = re.compile(
+    r"\bfor\s+(?P<amount>\d+(?:\.\d+)?|an?|one|two|three)\s*"
+    r"(?P<unit>hours?|hrs?|h|minutes?|mins?)\b",
+    re.IGNORECASE
+)
+
+# Leading verbs and articles that aren't part of the event title
+_FILLER_RE = re.compile(
+    r"^(?:(?:please|schedule|add|book|create|set\s+up|put|plan)\s+)*(?:(?:a|an|the|my)\s+)?",
+    re.IGNORECASE
+)
+
+# Dangling prepositions left behind once the time phrases are removed
+_TRAILING_PREP_RE = re.compile(r"\s+(?:on|at|for)$", re.IGNORECASE)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
+    "friday": 4, "saturday": 5, "sunday": 6
+}
+
+_WORD_AMOUNTS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3}
+
+_NAMED_HOURS = {"noon": 12, "midnight": 0}
+
+_ONE_HOUR = timedelta(hours=1)
+
+# Fast-path hit counters, exposed through the parser status
+_stats = {"attempts": 0, "hits": 0}
+_stats_lock = threading.Lock()
+
+def try_fast_parse(user_input: str, now: datetime) -> Tuple[Optional[Dict], float]:
+    """
+    Parse regular phrasings like "lunch with Sam tomorrow at noon" locally.
+    
+    Confidence is only high when the request has an explicit clock time, an
+    unambiguous day and a usable title, so anything the rules can't pin down
+    is left to the LLM.
+    
+    Args:
+        user_input: Natural language event description
+        now: Current naive datetime in the user's timezone
+    
+    Returns:
+        Tuple of (event dictionary or None, confidence between 0 and 1)
+    """
+    event, confidence = _parse(user_input, now)
+    with _stats_lock:
+        _stats["attempts"] += 1
+        if event is not None and confidence >= FAST_PATH_THRESHOLD:
+            _stats["hits"] += 1
+    return event, confidence
+
+def get_fast_path_stats() -> Dict:
+    """Get fast-path attempt and hit counts."""
+    with _stats_lock:
+        attempts, hits = _stats["attempts"], _stats["hits"]
+    return {
+        "attempts": attempts,
+        "hits": hits,
+        "hit_rate": round(hits / attempts, 3) if attempts else 0.0
+    }
+
+def _single_match(pattern: re.Pattern, text: str) -> Tuple[Optional[re.Match], bool]:
+    """Return (first match, whether it is the only one) without collecting all matches."""
+    match = pattern.search(text)
+    if match is None:
+        return None, True
+    return match, pattern.search(text, match.end()) is None
+
+def _parse(user_input: str, now: datetime) -> Tuple[Optional[Dict], float]:
+    # Exactly one explicit clock time is required; checking it first rejects
+    # most free-form requests after a single scan
+    time_match, unique = _single_match(_TIME_RE, user_input)
+    if time_match is None or not unique:
+        return None, 0.0
+    if _TIME_PREFIX_RE.search(user_input, 0, time_match.start()):
+        return None, 0.0
+    
+    if _AMBIGUOUS_RE.search(user_input):
+        return None, 0.0
+    
+    day_match, unique = _single_match(_DAY_RE, user_input)
+    if not unique:
+        return None, 0.0
+    
+    duration_match, unique = _single_match(_DURATION_RE, user_input)
+    if not unique:
+        return None, 0.0
+    
+    # Resolve the clock time
+    if time_match.group("named"):
+        hour, minute = _NAMED_HOURS[time_match.group("named").lower()], 0
+    elif time_match.group("hour24"):
+        hour, minute = int(time_match.group("hour24")), int(time_match.group("minute24"))
+    else:
+        hour = int(time_match.group("hour")) % 12
+        if time_match.group("ampm").lower() == "p":
+            hour += 12
+        minute = int(time_match.group("minute") or 0)
+    
+    midnight = now - timedelta(
+        hours=now.hour, minutes=now.minute, seconds=now.second, microseconds=now.microsecond
+    )
+    confidence = 0.45
+    
+    # Resolve the day; without one the prompt rules assume today. A time
+    # today is only trusted when it hasn't already passed
+    if day_match is None:
+        start = midnight + timedelta(hours=hour, minutes=minute)
+        if start > now:
+            confidence += 0.15
+    else:
+        day = day_match.group("day").lower()
+        if day == "today":
+            days_ahead = 0
+        elif day == "tomorrow":
+            days_ahead = 1
+        else:
+            # A bare weekday means its next occurrence, never today
+            days_ahead = (_WEEKDAYS[day] - now.weekday()) % 7 or 7
+        start = midnight + timedelta(days=days_ahead, hours=hour, minutes=minute)
+        if start > now:
+            confidence += 0.25
+    
+    # Resolve the duration, defaulting to one hour
+    duration = _ONE_HOUR
+    if duration_match is not None:
+        amount = duration_match.group("amount").lower()
+        value = _WORD_AMOUNTS.get(amount) or float(amount)
+        if duration_match.group("unit").lower().startswith("h"):
+            duration = timedelta(hours=value)
+        else:
+            duration = timedelta(minutes=value)
+        if duration <= timedelta(0):
+            return None, 0.0
+    
+    # Whatever remains once the date/time phrases are cut out is the title
+    title = user_input
+    for match in sorted(
+        (m for m in (time_match, day_match, duration_match) if m is not None),
+        key=lambda m: m.start(),
+        reverse=True
+    ):
+        title = title[:match.start()] + " " + title[match.end():]
+    title = _FILLER_RE.sub("", _WHITESPACE_RE.sub(" ", title).strip(" ,.!"))
+    title = _TRAILING_PREP_RE.sub("", title).strip(" ,.!")
+    if title and any(c.isalpha() for c in title) and len(title.split()) <= 6:
+        # A title ending in a digit or punctuation usually holds leftovers
+        # of a date or time the rules didn't recognize
+        confidence += 0.3 if title[-1].isalpha() else 0.1
+        title = title[0].upper() + title[1:]
+    else:
+        title = "Event"
+    
+    end = start + duration
+    event = {
+        "title": title,
+        "start_datetime": start.isoformat(),
+        "end_datetime": end.isoformat(),
+        "description": f"Created from: {user_input}",
+        "location": "",
+        "attendees": [],
+        "_start_dt": start,
+        "_end_dt": end
+    }
+    return event, round(confidence, 2)
\ No newline at end of file
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from .parse_cache import normalize_request
+
+logger = logging.getLogger(__name__)
+
+# Async parse handler: (user_input, timezone) -> parsed event or None
+ParseHandler = Callable[[str, str], Awaitable[Optional[Dict]]]
+
+class InflightParses:
+    """
+    Share one parse between concurrent identical requests.
+    
+    A request whose normalized text and timezone match a parse that is
+    already running awaits that parse instead of starting another backend
+    call. Other requests go straight to the handler with no added wait.
+    """
+    
+    def __init__(self, handler: ParseHandler):
+        self.handler = handler
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+    
+    async def submit(self, user_input: str, timezone: str) -> Optional[Dict]:
+        """
+        Parse a request, joining an identical one already in flight.
+        
+        Args:
+            user_input: Natural language event description
+            timezone: User's timezone
+        
+        Returns:
+            Parsed event dictionary or None if parsing fails
+        """
+        key = (timezone, normalize_request(user_input))
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.handler(user_input, timezone))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            logger.debug("Joining in-flight parse for %r", user_input)
+        
+        # Shielded so one caller disconnecting doesn't cancel the others
+        result = await asyncio.shield(task)
+        
+        # Callers mutate the event, so each gets its own copy
+        return dict(result) if result is not None else None
\ No newline at end of file
@@ -1,90 +1,42 @@
-import json
 import logging
+import threading
 from typing import Dict, Optional
 from datetime import datetime, timedelta
-import pytz
-from langchain_community.llms import HuggingFaceHub
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from .config import get_huggingface_token
+from .config import get_huggingface_token, get_llm_endpoint_url, get_llm_model
+from .llm_simple import call_huggingface_api
+from .parse_cache import ParseCache
+from .prompt import (
+    LLM_PARAMETERS, extract_event_dict, get_current_datetime, render_prompt
+)
 
 logger = logging.getLogger(__name__)
 
-# Event parsing prompt template
-EVENT_PARSING_PROMPT = """
-You are a calendar assistant. Parse the following natural language request into a structured event.
-
-Current date and time: {current_datetime}
-User timezone: {timezone}
-
-Request: "{user_input}"
-
-Extract the following information and respond ONLY with valid JSON in this exact format:
-{{
-    "title": "Event title",
-    "start_datetime": "YYYY-MM-DDTHH:MM:SS",
-    "end_datetime": "YYYY-MM-DDTHH:MM:SS", 
-    "description": "Event description or empty string",
-    "location": "Event location or empty string",
-    "attendees": []
-}}
-
-Rules:
-1. If no end time is specified, assume 1 hour duration
-2. If no date is specified, assume today
-3. If time is specified without AM/PM, use 24-hour format context
-4. Convert all times to the user's timezone
-5. Use ISO format for datetime (YYYY-MM-DDTHH:MM:SS)
-6. Keep attendees array empty unless email addresses are explicitly mentioned
-7. Make reasonable assumptions for missing information
-8. Respond with ONLY the JSON object, no other text
-
-JSON:
-"""
+# Default event length for the fallback parser
+_ONE_HOUR = timedelta(hours=1)
 
 class LLMEventParser:
     def __init__(self):
-        self.llm = None
-        self.chain = None
+        self.cache = ParseCache()
         self._initialize_llm()
     
     def _initialize_llm(self):
-        """Initialize the Hugging Face LLM and chain."""
+        """Check that a hosted or self-hosted LLM is configured."""
         try:
-            hf_token = get_huggingface_token()
-            if not hf_token:
+            # A self-hosted text-generation-inference server needs no token
+            if not get_huggingface_token() and not get_llm_endpoint_url():
                 raise ValueError("Hugging Face token not found in configuration")
             
-            # Initialize Hugging Face Hub LLM
-            self.llm = HuggingFaceHub(
-                repo_id="microsoft/DialoGPT-medium",  # Fallback model for testing
-                model_kwargs={
-                    "temperature": 0.1,
-                    "max_length": 512,
-                    "return_full_text": False
-                },
-                huggingfacehub_api_token=hf_token
-            )
-            
-            # Create prompt template
-            prompt_template = PromptTemplate(
-                input_variables=["current_datetime", "timezone", "user_input"],
-                template=EVENT_PARSING_PROMPT
-            )
-            
-            # Create LLM chain
-            self.chain = LLMChain(
-                llm=self.llm,
-                prompt=prompt_template
-            )
-            
             logger.info("LLM initialized successfully")
             
         except Exception as e:
             logger.error(f"Failed to initialize LLM: {e}")
             raise
     
-    def parse_event(self, user_input: str, timezone: str = "UTC") -> Optional[Dict]:
+    async def _generate(self, prompt: str) -> Optional[str]:
+        """Run a formatted prompt through the shared Inference API client."""
+        return await call_huggingface_api(prompt, get_llm_model(), LLM_PARAMETERS)
+    
+    async def parse_event(self, user_input: str, timezone: str = "UTC") -> Optional[Dict]:
         """
         Parse natural language input into structured event data.
         
@@ -97,79 +49,61 @@ class LLMEventParser:
         """
         try:
             # Get current datetime in user's timezone
-            tz = pytz.timezone(timezone)
-            current_dt = datetime.now(tz)
-            
-            # Run the LLM chain
-            result = self.chain.run(
-                current_datetime=current_dt.strftime("%Y-%m-%d %H:%M:%S %Z"),
-                timezone=timezone,
-                user_input=user_input
-            )
+            current_date, current_datetime = get_current_datetime(timezone)
+            
+            # Serve repeated requests from the cache before calling the LLM
+            cached = self.cache.get(user_input, timezone, current_date)
+            if cached:
+                logger.info(f"Parse cache hit: {cached['title']}")
+                return cached
+            
+            # Call the model directly with the formatted prompt
+            result = await self._generate(render_prompt(current_datetime, timezone, user_input))
+            if not result:
+                logger.error("Empty response from LLM")
+                return None
             
             # Clean up the result and extract JSON
-            json_str = self._extract_json_from_response(result)
-            if not json_str:
+            event_data = extract_event_dict(result)
+            if not event_data:
                 logger.error("No valid JSON found in LLM response")
                 return None
             
-            # Parse JSON
-            event_data = json.loads(json_str)
-            
             # Validate required fields
             required_fields = ["title", "start_datetime", "end_datetime"]
             if not all(field in event_data for field in required_fields):
                 logger.error(f"Missing required fields in parsed event: {event_data}")
                 return None
             
-            # Validate datetime format
+            # Validate datetime format, keeping the parsed values so the
+            # conflict check doesn't parse the same strings again
             try:
-                datetime.fromisoformat(event_data["start_datetime"])
-                datetime.fromisoformat(event_data["end_datetime"])
+                event_data["_start_dt"] = datetime.fromisoformat(event_data["start_datetime"])
+                event_data["_end_dt"] = datetime.fromisoformat(event_data["end_datetime"])
             except ValueError as e:
                 logger.error(f"Invalid datetime format: {e}")
                 return None
             
             logger.info(f"Successfully parsed event: {event_data['title']}")
+            self.cache.put(user_input, timezone, current_date, event_data)
             return event_data
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from LLM response: {e}")
-            return None
         except Exception as e:
             logger.error(f"Error parsing event with LLM: {e}")
             return None
-    
-    def _extract_json_from_response(self, response: str) -> Optional[str]:
-        """Extract JSON from LLM response, handling various formats."""
-        try:
-            # Try to find JSON object in response
-            response = response.strip()
-            
-            # Look for JSON object markers
-            start_idx = response.find('{')
-            end_idx = response.rfind('}')
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx + 1]
-                # Test if it's valid JSON
-                json.loads(json_str)
-                return json_str
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error extracting JSON: {e}")
-            return None
 
 # Global parser instance
 _parser = None
+_parser_lock = threading.Lock()
 
 def get_parser() -> LLMEventParser:
     """Get or create global parser instance."""
     global _parser
+    # Double-checked so concurrent first requests build the parser only once
     if _parser is None:
-        _parser = LLMEventParser()
+        with _parser_lock:
+            if _parser is None:
+                _parser = LLMEventParser()
     return _parser
 
 async def parse_event_with_llm(user_input: str, timezone: str = "UTC") -> Optional[Dict]:
@@ -185,7 +119,7 @@ async def parse_event_with_llm(user_input: str, timezone: str = "UTC") -> Option
     """
     try:
         parser = get_parser()
-        return parser.parse_event(user_input, timezone)
+        return await parser.parse_event(user_input, timezone)
     except Exception as e:
         logger.error(f"Error in async event parsing: {e}")
         return None
@@ -199,11 +133,13 @@ def parse_event_fallback(user_input: str, timezone: str = "UTC") -> Optional[Dic
         # This is a very basic fallback - in production you might want more sophisticated parsing
         logger.warning("Using fallback parser - limited functionality")
         
-        # Default event structure
+        # Default event structure, starting at the top of the current hour
+        now = datetime.now()
+        start = now - timedelta(minutes=now.minute, seconds=now.second, microseconds=now.microsecond)
         event = {
             "title": user_input[:50] + "..." if len(user_input) > 50 else user_input,
-            "start_datetime": datetime.now().replace(minute=0, second=0, microsecond=0).isoformat(),
-            "end_datetime": (datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)).isoformat(),
+            "start_datetime": start.isoformat(),
+            "end_datetime": (start + _ONE_HOUR).isoformat(),
             "description": f"Parsed from: {user_input}",
             "location": "",
             "attendees": []
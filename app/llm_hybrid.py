@@ -1,5 +1,7 @@
-import json
+import time
+import asyncio
 import logging
+import threading
 from typing import Dict, Optional
 from datetime import datetime, timedelta
 import os
@@ -7,160 +9,89 @@ import os
 logger = logging.getLogger(__name__)
 
 # Import simple parser as fallback
-from .llm_simple import parse_event_with_simple_llm
+from .llm_simple import parse_event_with_simple_llm, call_huggingface_api
+from .config import get_llm_endpoint_url, get_llm_model
+from .parse_cache import ParseCache
+from .prompt import (
+    LLM_PARAMETERS, extract_event_dict, get_current_datetime, get_timezone, render_prompt
+)
+from .inflight import InflightParses
+from .fast_parser import try_fast_parse, get_fast_path_stats, FAST_PATH_THRESHOLD
 
 class HybridEventParser:
     def __init__(self):
-        self.langchain_available = False
-        self.langchain_parser = None
-        self._initialize_langchain()
+        self.llm_available = False
+        self.cache = ParseCache()
+        self._initialize_llm()
     
-    def _initialize_langchain(self):
-        """Try to initialize LangChain, fall back gracefully if it fails."""
-        try:
-            # Check if we have required environment variables
-            hf_token = os.getenv('HUGGINGFACE_API_TOKEN')
-            if not hf_token:
-                logger.info("HUGGINGFACE_API_TOKEN not found - will use simple parser only")
-                return
-            
-            # Try to import LangChain components
-            from langchain_community.llms import HuggingFaceHub
-            from langchain.prompts import PromptTemplate
-            from langchain.chains import LLMChain
-            
-            # Initialize the LLM
-            llm = HuggingFaceHub(
-                repo_id="microsoft/DialoGPT-medium",
-                model_kwargs={
-                    "temperature": 0.1,
-                    "max_length": 512,
-                    "return_full_text": False
-                },
-                huggingfacehub_api_token=hf_token
-            )
-            
-            # Create prompt template
-            prompt_template = PromptTemplate(
-                input_variables=["current_datetime", "timezone", "user_input"],
-                template=self._get_event_parsing_prompt()
-            )
-            
-            # Create LLM chain
-            self.langchain_parser = LLMChain(
-                llm=llm,
-                prompt=prompt_template
-            )
-            
-            self.langchain_available = True
-            logger.info("✅ LangChain initialized successfully - advanced parsing enabled")
-            
-        except ImportError as e:
-            logger.warning(f"LangChain not available: {e} - using simple parser only")
-        except Exception as e:
-            logger.warning(f"Failed to initialize LangChain: {e} - using simple parser only")
-    
-    def _get_event_parsing_prompt(self) -> str:
-        """Get the prompt template for LangChain event parsing."""
-        return """
-You are a calendar assistant. Parse the following natural language request into a structured event.
-
-Current date and time: {current_datetime}
-User timezone: {timezone}
-
-Request: "{user_input}"
-
-Extract the following information and respond ONLY with valid JSON in this exact format:
-{{
-    "title": "Event title",
-    "start_datetime": "YYYY-MM-DDTHH:MM:SS",
-    "end_datetime": "YYYY-MM-DDTHH:MM:SS", 
-    "description": "Event description or empty string",
-    "location": "Event location or empty string",
-    "attendees": []
-}}
-
-Rules:
-1. If no end time is specified, assume 1 hour duration
-2. If no date is specified, assume today
-3. If time is specified without AM/PM, use 24-hour format context
-4. Convert all times to the user's timezone
-5. Use ISO format for datetime (YYYY-MM-DDTHH:MM:SS)
-6. Keep attendees array empty unless email addresses are explicitly mentioned
-7. Make reasonable assumptions for missing information
-8. Respond with ONLY the JSON object, no other text
-
-JSON:
-"""
+    def _initialize_llm(self):
+        """Enable LLM parsing if a Hugging Face token or local endpoint is configured."""
+        endpoint_url = get_llm_endpoint_url()
+        if endpoint_url:
+            self.llm_available = True
+            logger.info(f"✅ Using local LLM endpoint {endpoint_url} - advanced parsing enabled")
+            return
+        
+        if not os.getenv('HUGGINGFACE_API_TOKEN'):
+            logger.info("HUGGINGFACE_API_TOKEN not found - will use simple parser only")
+            return
+        
+        self.llm_available = True
+        logger.info(f"✅ Hugging Face API configured ({get_llm_model()}) - advanced parsing enabled")
     
-    def parse_with_langchain(self, user_input: str, timezone: str = "UTC") -> Optional[Dict]:
-        """Try to parse using LangChain."""
+    async def parse_with_llm(self, user_input: str, timezone: str = "UTC") -> Optional[Dict]:
+        """Try to parse using the Hugging Face LLM."""
         try:
-            if not self.langchain_available or not self.langchain_parser:
+            if not self.llm_available:
                 return None
             
             # Get current datetime in user's timezone
-            import pytz
-            tz = pytz.timezone(timezone)
-            current_dt = datetime.now(tz)
-            
-            # Run the LLM chain
-            result = self.langchain_parser.run(
-                current_datetime=current_dt.strftime("%Y-%m-%d %H:%M:%S %Z"),
-                timezone=timezone,
-                user_input=user_input
-            )
+            current_date, current_datetime = get_current_datetime(timezone)
+            
+            # Serve repeated requests from the cache before calling the LLM
+            cached = self.cache.get(user_input, timezone, current_date)
+            if cached:
+                logger.info(f"✅ Parse cache hit: {cached['title']}")
+                return cached
+            
+            # Call the model directly with the formatted prompt
+            prompt = render_prompt(current_datetime, timezone, user_input)
+            result = await call_huggingface_api(prompt, get_llm_model(), LLM_PARAMETERS)
+            if not result:
+                return None
             
             # Extract and parse JSON from response
-            json_str = self._extract_json_from_response(result)
-            if not json_str:
-                logger.warning("No valid JSON found in LangChain response")
+            event_data = extract_event_dict(result)
+            if not event_data:
+                logger.warning("No valid JSON found in LLM response")
                 return None
             
-            event_data = json.loads(json_str)
-            
             # Validate required fields
             required_fields = ["title", "start_datetime", "end_datetime"]
             if not all(field in event_data for field in required_fields):
-                logger.warning(f"Missing required fields in LangChain response: {event_data}")
+                logger.warning(f"Missing required fields in LLM response: {event_data}")
                 return None
             
-            # Validate datetime format
+            # Validate datetime format, keeping the parsed values so the
+            # conflict check doesn't parse the same strings again
             try:
-                datetime.fromisoformat(event_data["start_datetime"])
-                datetime.fromisoformat(event_data["end_datetime"])
+                event_data["_start_dt"] = datetime.fromisoformat(event_data["start_datetime"])
+                event_data["_end_dt"] = datetime.fromisoformat(event_data["end_datetime"])
             except ValueError as e:
-                logger.warning(f"Invalid datetime format from LangChain: {e}")
+                logger.warning(f"Invalid datetime format from LLM: {e}")
                 return None
             
-            logger.info(f"✅ LangChain successfully parsed: {event_data['title']}")
+            logger.info(f"✅ LLM successfully parsed: {event_data['title']}")
+            self.cache.put(user_input, timezone, current_date, event_data)
             return event_data
             
         except Exception as e:
-            logger.warning(f"LangChain parsing failed: {e}")
-            return None
-    
-    def _extract_json_from_response(self, response: str) -> Optional[str]:
-        """Extract JSON from LLM response."""
-        try:
-            response = response.strip()
-            start_idx = response.find('{')
-            end_idx = response.rfind('}')
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx + 1]
-                # Test if it's valid JSON
-                json.loads(json_str)
-                return json_str
-            
-            return None
-            
-        except Exception:
+            logger.warning(f"LLM parsing failed: {e}")
             return None
     
-    def parse_event(self, user_input: str, timezone: str = "UTC") -> Optional[Dict]:
+    async def parse_event(self, user_input: str, timezone: str = "UTC") -> Optional[Dict]:
         """
-        Hybrid parsing: Try LangChain first, fall back to simple parser.
+        Hybrid parsing: Try the fast path, then the LLM, then the simple parser.
         
         Args:
             user_input: Natural language event description
@@ -171,17 +102,28 @@ JSON:
         """
         logger.info(f"🔄 Parsing event with hybrid approach: {user_input}")
         
-        # Method 1: Try LangChain first
-        if self.langchain_available:
-            logger.debug("Attempting LangChain parsing...")
-            result = self.parse_with_langchain(user_input, timezone)
+        # Method 0: Regular phrasings are resolved locally without the LLM
+        try:
+            now = datetime.now(get_timezone(timezone)).replace(tzinfo=None)
+            event, confidence = try_fast_parse(user_input, now)
+            if event is not None and confidence >= FAST_PATH_THRESHOLD:
+                logger.info(f"⚡ Parsed with fast path (confidence {confidence})")
+                event["parsing_method"] = "fast_path"
+                return event
+        except Exception as e:
+            logger.debug(f"Fast path skipped: {e}")
+        
+        # Method 1: Try the LLM
+        if self.llm_available:
+            logger.debug("Attempting LLM parsing...")
+            result = await self.parse_with_llm(user_input, timezone)
             if result:
-                logger.info("✅ Successfully parsed with LangChain")
+                logger.info("✅ Successfully parsed with LLM")
                 return result
             else:
-                logger.info("⚠️ LangChain parsing failed, falling back to simple parser")
+                logger.info("⚠️ LLM parsing failed, falling back to simple parser")
         else:
-            logger.debug("LangChain not available, using simple parser")
+            logger.debug("LLM not available, using simple parser")
         
         # Method 2: Fallback to simple parser
         logger.debug("Attempting simple parsing...")
@@ -193,25 +135,74 @@ JSON:
             return result
         
         # Both methods failed
-        logger.error("❌ Both LangChain and simple parsing failed")
+        logger.error("❌ Both LLM and simple parsing failed")
         return None
 
 # Global hybrid parser instance
 _hybrid_parser = None
+_hybrid_parser_lock = threading.Lock()
 
 def get_hybrid_parser() -> HybridEventParser:
     """Get or create global hybrid parser instance."""
     global _hybrid_parser
+    # Double-checked so concurrent first requests build the parser only once
     if _hybrid_parser is None:
-        _hybrid_parser = HybridEventParser()
+        with _hybrid_parser_lock:
+            if _hybrid_parser is None:
+                _hybrid_parser = HybridEventParser()
     return _hybrid_parser
 
+async def _parse_with_hybrid_parser(user_input: str, timezone: str) -> Optional[Dict]:
+    return await get_hybrid_parser().parse_event(user_input, timezone)
+
+# Concurrent identical requests share a single parse
+_inflight_parses = InflightParses(_parse_with_hybrid_parser)
+
+# Background task priming the LLM endpoint after startup
+_warmup_task: Optional[asyncio.Task] = None
+
+async def _warm_up_llm():
+    """Send one throwaway prompt so the model is loaded before real traffic."""
+    started = time.perf_counter()
+    _, current_datetime = get_current_datetime("UTC")
+    result = await call_huggingface_api(
+        render_prompt(current_datetime, "UTC", "test"), get_llm_model(), LLM_PARAMETERS
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if result is None:
+        logger.warning(f"LLM warmup failed after {elapsed_ms:.0f} ms")
+    else:
+        logger.info(f"LLM warmup finished in {elapsed_ms:.0f} ms")
+
+def warm_up_parser():
+    """
+    Build the hybrid parser now and prime the LLM endpoint in the background.
+    
+    Hosted models can take several seconds to cold-start, so the warmup call
+    runs as a task instead of delaying application startup.
+    """
+    global _warmup_task
+    parser = get_hybrid_parser()
+    if parser.llm_available and _warmup_task is None:
+        _warmup_task = asyncio.create_task(_warm_up_llm())
+
+async def cancel_parser_warmup():
+    """Cancel the warmup call if it's still running."""
+    global _warmup_task
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+        try:
+            await _warmup_task
+        except asyncio.CancelledError:
+            pass
+        _warmup_task = None
+
 async def parse_event_with_llm(user_input: str, timezone: str = "UTC") -> Optional[Dict]:
     """
     Main parsing function with hybrid approach.
     
     This function:
-    1. Tries LangChain + Hugging Face API (if token available)
+    1. Tries the Hugging Face Inference API (if token available)
     2. Falls back to simple rule-based parsing
     3. Returns the best available result
     
@@ -223,21 +214,35 @@ async def parse_event_with_llm(user_input: str, timezone: str = "UTC") -> Option
         Parsed event dictionary or None if parsing fails
     """
     try:
-        parser = get_hybrid_parser()
-        return parser.parse_event(user_input, timezone)
+        return await _inflight_parses.submit(user_input, timezone)
     except Exception as e:
         logger.error(f"Error in hybrid event parsing: {e}")
         return None
 
+# Parser capabilities are fixed once the parser is built, so the status
+# is computed on first request and reused
+_parser_status: Optional[Dict] = None
+
 def get_parser_status() -> Dict:
     """Get status of available parsing methods."""
-    parser = get_hybrid_parser()
-    return {
-        "langchain_available": parser.langchain_available,
-        "huggingface_token_set": bool(os.getenv('HUGGINGFACE_API_TOKEN')),
-        "fallback_available": True,  # Simple parser is always available
-        "recommended_action": (
-            "Advanced parsing active" if parser.langchain_available 
-            else "Set HUGGINGFACE_API_TOKEN for advanced parsing"
-        )
-    } 
\ No newline at end of file
+    global _parser_status
+    if _parser_status is None:
+        parser = get_hybrid_parser()
+        _parser_status = {
+            "llm_available": parser.llm_available,
+            # Deprecated alias of llm_available, kept for existing consumers
+            "langchain_available": parser.llm_available,
+            "huggingface_token_set": bool(os.getenv('HUGGINGFACE_API_TOKEN')),
+            "llm_endpoint": get_llm_endpoint_url() or "huggingface_inference_api",
+            "fallback_available": True,  # Simple parser is always available
+            "recommended_action": (
+                "Advanced parsing active" if parser.llm_available 
+                else "Set HUGGINGFACE_API_TOKEN for advanced parsing"
+            )
+        }
+    
+    # Fast-path counters change per request, so they're read live
+    status = dict(_parser_status)
+    status["fast_path"] = get_fast_path_stats()
+    return status
+ 
\ No newline at end of file
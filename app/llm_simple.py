@@ -1,11 +1,38 @@
+import re
 import json
 import logging
-import requests
+import httpx
 from typing import Dict, Optional
 from datetime import datetime, timedelta
+from .config import DEFAULT_LLM_MODEL, get_llm_endpoint_url
 
 logger = logging.getLogger(__name__)
 
+# Keywords recognized by the rule-based parser, matched in a single pass
+KEYWORD_RE = re.compile(
+    r"\b(?:(?P<meeting>meeting)|(?P<appointment>appointment)|(?P<lunch>lunch)"
+    r"|(?P<call>call)|(?P<tomorrow>tomorrow)|(?P<next_week>next\s+week))",
+    re.IGNORECASE
+)
+
+# Event titles by keyword, in priority order when several match
+TITLE_MAP = {
+    "meeting": "Meeting",
+    "appointment": "Appointment",
+    "lunch": "Lunch",
+    "call": "Call",
+}
+
+# Day offsets by keyword, in priority order; these events start at 9 AM
+OFFSET_MAP = {
+    "tomorrow": timedelta(days=1),
+    "next_week": timedelta(days=7),
+}
+
+# Default event length and start time for day-offset events
+_ONE_HOUR = timedelta(hours=1)
+_HOUR9_DELTA = timedelta(hours=9)
+
 def parse_event_with_simple_llm(user_input: str, timezone: str = "UTC") -> Optional[Dict]:
     """
     Simplified event parser that creates structured events from natural language.
@@ -24,46 +51,34 @@ def parse_event_with_simple_llm(user_input: str, timezone: str = "UTC") -> Optio
         # This is a simple rule-based parser as a fallback
         # In production, this would call the Hugging Face API
         
-        # Default event structure
+        # Scan the input once for every known keyword
+        found = {match.lastgroup for match in KEYWORD_RE.finditer(user_input)}
+        
+        # Extract time information; default to the current hour. Truncation
+        # is done with a single subtraction rather than chained replace() calls
         now = datetime.now()
+        start = now - timedelta(minutes=now.minute, seconds=now.second, microseconds=now.microsecond)
+        offset = next((OFFSET_MAP[key] for key in OFFSET_MAP if key in found), None)
+        if offset is not None:
+            start += offset + _HOUR9_DELTA - timedelta(hours=start.hour)
+        end = start + _ONE_HOUR
+        
+        # Extract title (simplified); fall back to the first few words
+        title = next((TITLE_MAP[key] for key in TITLE_MAP if key in found), None)
+        if title is None:
+            title = " ".join(user_input.split()[:3]).title()
         
         event = {
-            "title": user_input[:50] + "..." if len(user_input) > 50 else user_input,
-            "start_datetime": now.replace(minute=0, second=0, microsecond=0).isoformat(),
-            "end_datetime": (now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)).isoformat(),
+            "title": title,
+            "start_datetime": start.isoformat(),
+            "end_datetime": end.isoformat(),
             "description": f"Created from: {user_input}",
             "location": "",
-            "attendees": []
+            "attendees": [],
+            "_start_dt": start,
+            "_end_dt": end
         }
         
-        # Simple parsing heuristics
-        lower_input = user_input.lower()
-        
-        # Extract time information
-        if "tomorrow" in lower_input:
-            tomorrow = now + timedelta(days=1)
-            event["start_datetime"] = tomorrow.replace(hour=9, minute=0, second=0, microsecond=0).isoformat()
-            event["end_datetime"] = tomorrow.replace(hour=10, minute=0, second=0, microsecond=0).isoformat()
-        
-        elif "next week" in lower_input:
-            next_week = now + timedelta(days=7)
-            event["start_datetime"] = next_week.replace(hour=9, minute=0, second=0, microsecond=0).isoformat()
-            event["end_datetime"] = next_week.replace(hour=10, minute=0, second=0, microsecond=0).isoformat()
-        
-        # Extract title (simplified)
-        if "meeting" in lower_input:
-            event["title"] = "Meeting"
-        elif "appointment" in lower_input:
-            event["title"] = "Appointment"
-        elif "lunch" in lower_input:
-            event["title"] = "Lunch"
-        elif "call" in lower_input:
-            event["title"] = "Call"
-        else:
-            # Extract the first few words as title
-            words = user_input.split()[:3]
-            event["title"] = " ".join(words).title()
-        
         logger.info(f"Parsed event successfully: {event['title']}")
         return event
         
@@ -78,29 +93,78 @@ async def parse_event_with_llm(user_input: str, timezone: str = "UTC") -> Option
     """
     return parse_event_with_simple_llm(user_input, timezone)
 
-def call_huggingface_api(prompt: str, model: str = "microsoft/DialoGPT-medium") -> Optional[str]:
+# Hugging Face Inference API base URL and request timeout in seconds
+HF_API_BASE_URL = "https://api-inference.huggingface.co"
+HF_API_TIMEOUT = 30
+
+# Shared async client; concurrent calls are multiplexed over one HTTP/2
+# connection instead of opening a new TLS connection per request
+_client: Optional[httpx.AsyncClient] = None
+
+def _get_client() -> httpx.AsyncClient:
+    """Get or create the shared Inference API client."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=HF_API_BASE_URL,
+            http2=True,
+            timeout=HF_API_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+    return _client
+
+async def init_hf_client():
+    """Create the shared Inference API client at startup."""
+    _get_client()
+
+async def close_hf_client():
+    """Close the shared Inference API client and its connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def call_huggingface_api(prompt: str, model: str = DEFAULT_LLM_MODEL,
+                               parameters: Optional[Dict] = None) -> Optional[str]:
     """
     Direct call to Hugging Face Inference API.
-    This can be used when LangChain has issues.
+    
+    When LLM_ENDPOINT_URL points at a self-hosted text-generation-inference
+    server, the prompt is sent to its /generate route instead and the model
+    is whatever that server was launched with.
+    
+    Args:
+        prompt: Fully formatted prompt text
+        model: Hugging Face model repository ID
+        parameters: Optional generation parameters
+        
+    Returns:
+        Generated text or None if the call fails
     """
     try:
         import os
         api_token = os.getenv('HUGGINGFACE_API_TOKEN')
-        if not api_token:
+        endpoint_url = get_llm_endpoint_url()
+        if not api_token and not endpoint_url:
             logger.warning("HUGGINGFACE_API_TOKEN not set")
             return None
         
-        headers = {"Authorization": f"Bearer {api_token}"}
-        api_url = f"https://api-inference.huggingface.co/models/{model}"
+        headers = {"Authorization": f"Bearer {api_token}"} if api_token else {}
+        url = f"{endpoint_url.rstrip('/')}/generate" if endpoint_url else f"/models/{model}"
         
         data = {"inputs": prompt}
+        if parameters:
+            data["parameters"] = parameters
         
-        response = requests.post(api_url, headers=headers, json=data)
+        response = await _get_client().post(url, headers=headers, json=data)
         
         if response.status_code == 200:
             result = response.json()
             if isinstance(result, list) and len(result) > 0:
                 return result[0].get('generated_text', '')
+            # text-generation-inference returns a single object
+            if isinstance(result, dict) and 'generated_text' in result:
+                return result['generated_text']
             return str(result)
         else:
             logger.error(f"Hugging Face API error: {response.status_code}")
@@ -2,19 +2,31 @@ from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List
+import time
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-from .llm_hybrid import parse_event_with_llm, get_parser_status
-from .api_simple import add_event_to_calendar, sync_calendar_events
-from .db import init_db, store_event, get_events, check_conflicts
-from .utils import detect_timezone
+from .llm_hybrid import (
+    parse_event_with_llm, get_parser_status, warm_up_parser, cancel_parser_warmup
+)
+from .llm_simple import init_hf_client, close_hf_client
+from .api_simple import add_event_to_calendar, sync_calendar_events_async
+from .db import init_db, store_event, get_events, check_conflicts_async, load_conflict_window
+from .utils import detect_timezone_async, close_timezone_client
 from .config import load_config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Conflict candidates loaded while a prompt is being parsed
+CONFLICT_PREFETCH_WINDOW = timedelta(days=14)
+
+# Health probes reuse the last database check for this many seconds
+HEALTH_CACHE_TTL = 5.0
+_HEALTH_CACHE = {"checked_at": None, "error": None}
+
 app = FastAPI(
     title="Smart Calendar Assistant",
     description="LLM-powered personal calendar assistant",
@@ -46,6 +58,18 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
+    
+    await init_hf_client()
+    
+    # Build the parser now rather than on the first request
+    warm_up_parser()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers on shutdown."""
+    await cancel_parser_warmup()
+    await close_hf_client()
+    await close_timezone_client()
 
 @app.get("/")
 async def root():
@@ -65,22 +89,35 @@ async def add_event(request: EventRequest):
     """
     try:
         # Detect timezone if not provided
-        user_timezone = request.timezone or detect_timezone()
+        user_timezone = request.timezone or await detect_timezone_async()
         logger.info(f"Processing event request: {request.prompt}")
         
-        # Step 1: Parse with LLM
-        parsed_event = await parse_event_with_llm(request.prompt, user_timezone)
-        if not parsed_event:
-            return EventResponse(
-                success=False,
-                message="Failed to parse event from prompt. Please try rephrasing."
-            )
-        
-        # Step 2: Check for conflicts
-        conflicts = check_conflicts(
-            parsed_event["start_datetime"], 
-            parsed_event["end_datetime"]
-        )
+        # Most requests fall in the next two weeks, so their conflict
+        # candidates are loaded while the prompt is parsed
+        window_start = datetime.now(timezone.utc)
+        prefetch = asyncio.create_task(asyncio.to_thread(
+            load_conflict_window, window_start, window_start + CONFLICT_PREFETCH_WINDOW
+        ))
+        try:
+            # Step 1: Parse with LLM
+            parsed_event = await parse_event_with_llm(request.prompt, user_timezone)
+            if not parsed_event:
+                return EventResponse(
+                    success=False,
+                    message="Failed to parse event from prompt. Please try rephrasing."
+                )
+            
+            # Step 2: Check for conflicts, reusing the parser's datetimes;
+            # events outside the prefetched window are queried directly
+            start = parsed_event.get("_start_dt") or parsed_event["start_datetime"]
+            end = parsed_event.get("_end_dt") or parsed_event["end_datetime"]
+            candidates = await prefetch
+            if candidates.covers(start, end):
+                conflicts = candidates.find(start, end)
+            else:
+                conflicts = await check_conflicts_async(start, end)
+        finally:
+            prefetch.cancel()
         
         if conflicts:
             return EventResponse(
@@ -99,7 +136,9 @@ async def add_event(request: EventRequest):
         
         # Step 4: Store in local DB
         parsed_event["calendar_event_id"] = calendar_event_id
-        store_event(parsed_event)
+        if store_event(parsed_event) is None:
+            # The event is in Google Calendar; the next sync stores it locally
+            logger.warning(f"Event {calendar_event_id} was not stored in the local database")
         
         return EventResponse(
             success=True,
@@ -124,7 +163,7 @@ async def sync_calendar():
         logger.info("Starting calendar sync...")
         
         # Sync events from Google Calendar
-        events_synced = sync_calendar_events()
+        events_synced = await sync_calendar_events_async()
         
         return SyncResponse(
             success=True,
@@ -175,8 +214,19 @@ async def get_calendar_events(
 async def health_check():
     """Detailed health check including database and API connectivity."""
     try:
-        # Check database connectivity
-        events = get_events(limit=1)
+        # Check database connectivity, at most once per TTL window
+        now = time.monotonic()
+        checked_at = _HEALTH_CACHE["checked_at"]
+        if checked_at is None or now - checked_at >= HEALTH_CACHE_TTL:
+            try:
+                get_events(limit=1)
+                _HEALTH_CACHE["error"] = None
+            except Exception as e:
+                _HEALTH_CACHE["error"] = str(e)
+            _HEALTH_CACHE["checked_at"] = now
+        
+        if _HEALTH_CACHE["error"] is not None:
+            raise RuntimeError(_HEALTH_CACHE["error"])
         db_status = "connected"
         
         # TODO: Add Google Calendar API connectivity check
@@ -0,0 +1,84 @@
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Requests anchored to the current moment ("in 2 hours", "now") resolve
+# differently every time, so their parses are never cached
+_RELATIVE_TO_NOW_RE = re.compile(
+    r"\b(now|right away|asap|in\s+(an?|\d+)\s*(mins?|minutes?|hrs?|hours?))\b",
+    re.IGNORECASE
+)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_request(user_input: str) -> str:
+    """Normalize a request so trivially different phrasings share a key."""
+    return _WHITESPACE_RE.sub(" ", user_input.strip().lower())
+
+class ParseCache:
+    """
+    LRU cache of LLM parse results.
+    
+    Keys combine the normalized request with the user's timezone and local
+    date, so "lunch tomorrow at noon" is answered from memory for the rest
+    of the day instead of making another inference call. Entries from
+    earlier days can never match again and age out of the LRU.
+    """
+    
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def is_cacheable(user_input: str) -> bool:
+        """Check whether a request's parse can be reused later in the day."""
+        return not _RELATIVE_TO_NOW_RE.search(user_input)
+    
+    def get(self, user_input: str, timezone: str, current_date: str) -> Optional[Dict]:
+        """
+        Look up a cached parse.
+        
+        Args:
+            user_input: Natural language event description
+            timezone: User's timezone
+            current_date: Today's date in the user's timezone (ISO format)
+        
+        Returns:
+            Copy of the cached event dictionary or None on a miss
+        """
+        key = (timezone, current_date, normalize_request(user_input))
+        with self._lock:
+            event = self._entries.get(key)
+            if event is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        
+        logger.debug("Parse cache hit for: %s", user_input)
+        return _copy_event(event)
+    
+    def put(self, user_input: str, timezone: str, current_date: str, event: Dict):
+        """Cache a successful parse, unless the request is relative to now."""
+        if not self.is_cacheable(user_input):
+            return
+        
+        key = (timezone, current_date, normalize_request(user_input))
+        with self._lock:
+            self._entries[key] = _copy_event(event)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+def _copy_event(event: Dict) -> Dict:
+    """Copy an event so callers can't mutate the cached entry."""
+    copied = dict(event)
+    copied['attendees'] = list(event.get('attendees', []))
+    return copied
\ No newline at end of file
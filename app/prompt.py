@@ -0,0 +1,112 @@
+import json
+import time
+import logging
+import functools
+from typing import Dict, Optional, Tuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Event parsing prompt template, split so the instructions form a
+# byte-identical prefix across calls and only the short suffix varies;
+# this lets inference servers with prefix caching skip re-processing it
+EVENT_PARSING_PREFIX = """
+You are a calendar assistant. Parse the natural language request given at the end into a structured event.
+
+Extract the following information and respond ONLY with valid JSON in this exact format:
+{{
+    "title": "Event title",
+    "start_datetime": "YYYY-MM-DDTHH:MM:SS",
+    "end_datetime": "YYYY-MM-DDTHH:MM:SS", 
+    "description": "Event description or empty string",
+    "location": "Event location or empty string",
+    "attendees": []
+}}
+
+Rules:
+1. If no end time is specified, assume 1 hour duration
+2. If no date is specified, assume today
+3. If time is specified without AM/PM, use 24-hour format context
+4. Convert all times to the user's timezone
+5. Use ISO format for datetime (YYYY-MM-DDTHH:MM:SS)
+6. Keep attendees array empty unless email addresses are explicitly mentioned
+7. Make reasonable assumptions for missing information
+8. Respond with ONLY the JSON object, no other text
+"""
+
+EVENT_PARSING_SUFFIX = """
+Current date and time: {current_datetime}
+User timezone: {timezone}
+
+Request: "{user_input}"
+
+JSON:
+"""
+
+EVENT_PARSING_PROMPT = EVENT_PARSING_PREFIX + EVENT_PARSING_SUFFIX
+
+# The prefix has no variables, so its escaped braces are resolved once here
+# and each request only formats the short suffix
+_RENDERED_PREFIX = EVENT_PARSING_PREFIX.format()
+
+def render_prompt(current_datetime: str, timezone: str, user_input: str) -> str:
+    """Render the event parsing prompt for one request."""
+    return _RENDERED_PREFIX + EVENT_PARSING_SUFFIX.format_map({
+        "current_datetime": current_datetime,
+        "timezone": timezone,
+        "user_input": user_input
+    })
+
+# Generation settings for the Hugging Face Inference API
+LLM_PARAMETERS = {
+    "temperature": 0.1,
+    "max_new_tokens": 256,
+    "return_full_text": False
+}
+
+@functools.lru_cache(maxsize=128)
+def get_timezone(name: str):
+    """Look up a timezone object once per name."""
+    import pytz
+    return pytz.timezone(name)
+
+# Current date and formatted datetime per timezone, refreshed once a second
+_NOW_CACHE: Dict[str, Tuple[int, str, str]] = {}
+
+def get_current_datetime(timezone: str) -> Tuple[str, str]:
+    """Return (ISO date, formatted datetime) for now in the given timezone."""
+    tick = int(time.time())
+    cached = _NOW_CACHE.get(timezone)
+    if cached is not None and cached[0] == tick:
+        return cached[1], cached[2]
+    
+    current_dt = datetime.now(get_timezone(timezone))
+    current_date = current_dt.date().isoformat()
+    formatted = current_dt.strftime("%Y-%m-%d %H:%M:%S %Z")
+    _NOW_CACHE[timezone] = (tick, current_date, formatted)
+    return current_date, formatted
+
+# Reused decoder for pulling the event object out of model output
+_JSON_DECODER = json.JSONDecoder()
+
+# Bounds on the response scan: where the object may start, and how long it
+# may be (a valid event is well under 1KB, so longer output means the
+# model is looping)
+_JSON_SEARCH_LIMIT = 65536
+_JSON_MAX_LENGTH = 4096
+
+def extract_event_dict(response: str) -> Optional[Dict]:
+    """Decode the first JSON object in an LLM response, ignoring surrounding text."""
+    start_idx = response.find('{', 0, _JSON_SEARCH_LIMIT)
+    if start_idx == -1:
+        return None
+    
+    # raw_decode stops at the end of the first complete value, so trailing
+    # model chatter doesn't need to be located and trimmed first
+    snippet = response[start_idx:start_idx + _JSON_MAX_LENGTH]
+    try:
+        event_data, _ = _JSON_DECODER.raw_decode(snippet)
+        return event_data
+    except json.JSONDecodeError as e:
+        logger.debug("Error extracting JSON: %s", e)
+        return None
\ No newline at end of file
@@ -1,7 +1,7 @@
 import logging
 import asyncio
 from datetime import datetime
-from .api_simple import sync_calendar_events
+from .api_simple import sync_calendar_events_async
 from .config import get_sync_days_ahead
 
 logger = logging.getLogger(__name__)
@@ -18,7 +18,7 @@ async def daily_sync_job():
         days_ahead = get_sync_days_ahead()
         
         # Perform sync
-        events_synced = sync_calendar_events(days_ahead)
+        events_synced = await sync_calendar_events_async(days_ahead)
         
         logger.info(f"Daily sync completed successfully. Synced {events_synced} events.")
         
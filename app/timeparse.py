@@ -0,0 +1,35 @@
+import os
+import sys
+import logging
+from typing import Union
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+if sys.version_info >= (3, 11):
+    # fromisoformat accepts a trailing 'Z' natively from 3.11
+    _parse_iso = datetime.fromisoformat
+else:
+    def _parse_iso(value: str) -> datetime:
+        """Parse an ISO 8601 string, accepting a trailing 'Z' for UTC."""
+        return datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+
+# ciso8601 is faster but accepts a different set of strings than
+# fromisoformat, so it is only used when explicitly enabled
+if os.getenv('USE_CISO8601', '').lower() in ('1', 'true', 'yes'):
+    try:
+        from ciso8601 import parse_datetime as _parse_iso
+    except ImportError:
+        logger.warning("USE_CISO8601 is set but ciso8601 is not installed")
+
+# Datetimes given either as ISO 8601 strings or already parsed
+DateTimeLike = Union[str, datetime]
+
+def parse_iso(value: DateTimeLike) -> datetime:
+    """
+    Parse an ISO 8601 string, passing datetime objects through unchanged.
+    
+    Callers that format or convert the same value several times can parse
+    it here once and pass the datetime to the other helpers.
+    """
+    return value if isinstance(value, datetime) else _parse_iso(value)
\ No newline at end of file
@@ -1,66 +1,259 @@
+import os
+import re
+import time
 import logging
+import functools
+import httpx
 import requests
-from typing import Optional
-from datetime import datetime
-import pytz
+from operator import itemgetter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pathlib import Path
+from typing import Iterable, List, Optional
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+from .timeparse import DateTimeLike, parse_iso
 
 logger = logging.getLogger(__name__)
 
-def detect_timezone() -> str:
-    """
-    Detect user's timezone based on IP address.
-    Falls back to UTC if detection fails.
-    """
+@functools.lru_cache(maxsize=512)
+def _get_tz(name: str) -> ZoneInfo:
+    """Look up a timezone once per name."""
+    return ZoneInfo(name)
+
+_get_tz("UTC")
+
+# UTC has no DST, so naive UTC values can simply be tagged with it
+_UTC = timezone.utc
+
+_ONE_MINUTE = timedelta(minutes=1)
+
+# Cheap shape check run before the parser, so obvious garbage is rejected
+# without raising; it only looks at the date and the start of the time, in
+# extended or basic format, and leaves the rest to the parser
+_ISO_RE = re.compile(r"\d{4}-?\d{2}-?\d{2}(?:$|[T ]\d{2})")
+_ISO_MAX_LENGTH = 40
+
+def _safe_parse(value: DateTimeLike) -> Optional[datetime]:
+    """Parse like parse_iso, returning None instead of raising for bad input."""
     try:
-        # Try to get timezone from IP-based service
-        response = requests.get('http://ip-api.com/json/', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            timezone = data.get('timezone')
-            if timezone:
-                # Validate timezone
-                try:
-                    pytz.timezone(timezone)
-                    logger.info(f"Detected timezone: {timezone}")
-                    return timezone
-                except pytz.exceptions.UnknownTimeZoneError:
-                    logger.warning(f"Invalid timezone detected: {timezone}")
-        
-    except Exception as e:
-        logger.warning(f"Failed to detect timezone: {e}")
+        return parse_iso(value)
+    except (ValueError, TypeError):
+        return None
+
+# Shared session for the IP geolocation service, so repeated lookups reuse
+# one pooled keep-alive connection and transient failures are retried
+IP_API_URL = 'http://ip-api.com/json/'
+_SESSION = requests.Session()
+_SESSION.mount('http://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=1,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=(429, 502, 503, 504))
+))
+
+# Separate connect and read timeouts so an unreachable service fails fast
+IP_API_TIMEOUT = (1, 3)
+
+# Async client for lookups made from the event loop, created on first use
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+
+# Detected timezone, reused until it expires; a failed detection is
+# retried sooner than a successful one
+_TZ_CACHE = {"value": None, "expires": 0.0}
+TZ_CACHE_TTL = 3600
+TZ_FALLBACK_TTL = 300
+
+# A host left on UTC says nothing about where the user is
+_UTC_NAMES = frozenset({
+    "UTC", "Etc/UTC", "Etc/Universal", "Universal", "Zulu", "Etc/Zulu", "GMT", "Etc/GMT"
+})
+
+@functools.lru_cache(maxsize=None)
+def _valid_timezones() -> frozenset:
+    """Names of all installed IANA timezones, scanned once on first use."""
+    return frozenset(available_timezones())
+
+def _is_valid_timezone(name: str) -> bool:
+    """Check whether a name is a known IANA timezone."""
+    valid = _valid_timezones()
+    if valid:
+        return name in valid
+    
+    # No tzdata listing on this system; fall back to loading the zone
+    try:
+        _get_tz(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+def _detect_local_timezone() -> Optional[str]:
+    """Read the host's configured timezone without touching the network."""
+    candidates = [os.getenv('TZ', '').lstrip(':')]
+    
+    try:
+        candidates.append(Path('/etc/timezone').read_text().strip())
+    except OSError:
+        pass
+    
+    try:
+        target = os.path.realpath('/etc/localtime')
+        if '/zoneinfo/' in target:
+            candidates.append(target.split('/zoneinfo/', 1)[1])
+    except OSError:
+        pass
+    
+    for name in candidates:
+        if name and name not in _UTC_NAMES and _is_valid_timezone(name):
+            return name
+    return None
+
+def _ip_response_timezone(response) -> Optional[str]:
+    """Pull a valid timezone name out of a requests or httpx response."""
+    if response.status_code == 200:
+        tz_name = response.json().get('timezone')
+        if tz_name:
+            # Validate timezone
+            if _is_valid_timezone(tz_name):
+                return tz_name
+            logger.warning("Invalid timezone detected: %s", tz_name)
+    return None
+
+def _detect_ip_timezone() -> Optional[str]:
+    """Look up the timezone for this host's public IP address."""
+    try:
+        response = _SESSION.get(IP_API_URL, timeout=IP_API_TIMEOUT)
+        return _ip_response_timezone(response)
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Failed to detect timezone: %s", e)
+    
+    return None
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Get or create the shared async client for IP lookups."""
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None:
+        connect_timeout, read_timeout = IP_API_TIMEOUT
+        _ASYNC_CLIENT = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+    return _ASYNC_CLIENT
+
+async def close_timezone_client():
+    """Close the async IP lookup client and its connection."""
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is not None:
+        await _ASYNC_CLIENT.aclose()
+        _ASYNC_CLIENT = None
+
+async def _detect_ip_timezone_async() -> Optional[str]:
+    """Look up the timezone for this host's public IP without blocking the loop."""
+    try:
+        response = await _get_async_client().get(IP_API_URL)
+        return _ip_response_timezone(response)
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Failed to detect timezone: %s", e)
+    
+    return None
+
+def _cached_timezone(now: float) -> Optional[str]:
+    """Return the cached timezone if it hasn't expired."""
+    if _TZ_CACHE["value"] is not None and now < _TZ_CACHE["expires"]:
+        return _TZ_CACHE["value"]
+    return None
+
+def _store_timezone(tz_name: Optional[str], now: float) -> str:
+    """Cache a detection result, falling back to UTC if nothing was found."""
+    if tz_name:
+        logger.info("Detected timezone: %s", tz_name)
+        _TZ_CACHE.update(value=tz_name, expires=now + TZ_CACHE_TTL)
+        return tz_name
     
     # Fallback to UTC
     logger.info("Using UTC as fallback timezone")
+    _TZ_CACHE.update(value="UTC", expires=now + TZ_FALLBACK_TTL)
     return "UTC"
 
-def format_datetime_for_user(dt_string: str, target_timezone: str = "UTC") -> str:
+def detect_timezone() -> str:
     """
-    Format datetime string for user display in their timezone.
+    Detect user's timezone from the host's settings, then its IP address.
+    The result is cached; falls back to UTC if detection fails.
+    """
+    now = time.monotonic()
+    cached = _cached_timezone(now)
+    if cached is not None:
+        return cached
+    
+    return _store_timezone(_detect_local_timezone() or _detect_ip_timezone(), now)
+
+async def detect_timezone_async() -> str:
+    """
+    Async variant of detect_timezone for use from the event loop.
+    Shares its cache, so either one reuses the other's result.
+    """
+    now = time.monotonic()
+    cached = _cached_timezone(now)
+    if cached is not None:
+        return cached
+    
+    tz_name = _detect_local_timezone() or await _detect_ip_timezone_async()
+    return _store_timezone(tz_name, now)
+
+def _format_local(dt: datetime, target_tz: ZoneInfo) -> str:
+    """Convert a datetime to the target timezone and format it for display."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=_UTC)
+    
+    local_dt = dt.astimezone(target_tz)
+    
+    # Same layout as "%Y-%m-%d %H:%M %Z" without going through strftime
+    return (
+        f"{local_dt.year:04d}-{local_dt.month:02d}-{local_dt.day:02d} "
+        f"{local_dt.hour:02d}:{local_dt.minute:02d} {local_dt.tzname() or ''}"
+    )
+
+def format_datetimes_for_user(dt_strings: Iterable[DateTimeLike],
+                              target_timezone: str = "UTC") -> List[str]:
+    """
+    Format several datetimes for user display in their timezone.
+    
+    The target timezone is resolved once for the whole batch. Values that
+    can't be parsed are returned unchanged, as with format_datetime_for_user.
     
     Args:
-        dt_string: ISO format datetime string
+        dt_strings: ISO format datetime strings or parsed datetimes
         target_timezone: Target timezone for display
         
     Returns:
-        Formatted datetime string
+        Formatted datetime strings, in input order
     """
     try:
-        # Parse the datetime
-        dt = datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
-        
-        # Convert to target timezone
-        target_tz = pytz.timezone(target_timezone)
-        if dt.tzinfo is None:
-            dt = pytz.UTC.localize(dt)
-        
-        local_dt = dt.astimezone(target_tz)
-        
-        # Format for display
-        return local_dt.strftime("%Y-%m-%d %H:%M %Z")
+        target_tz = _get_tz(target_timezone)
+    except (ValueError, ZoneInfoNotFoundError) as e:
+        logger.error("Error formatting datetime: %s", e)
+        return [str(value) for value in dt_strings]
+    
+    formatted = []
+    for value in dt_strings:
+        dt = _safe_parse(value)
+        if dt is None:
+            logger.error("Error formatting datetime: invalid value %r", value)
+            formatted.append(str(value))
+        else:
+            formatted.append(_format_local(dt, target_tz))
+    return formatted
+
+def format_datetime_for_user(dt_string: DateTimeLike, target_timezone: str = "UTC") -> str:
+    """
+    Format datetime string for user display in their timezone.
+    
+    Args:
+        dt_string: ISO format datetime string or parsed datetime
+        target_timezone: Target timezone for display
         
-    except Exception as e:
-        logger.error(f"Error formatting datetime: {e}")
-        return dt_string
+    Returns:
+        Formatted datetime string
+    """
+    return format_datetimes_for_user((dt_string,), target_timezone)[0]
 
 def validate_datetime_format(dt_string: str) -> bool:
     """
@@ -72,63 +265,74 @@ def validate_datetime_format(dt_string: str) -> bool:
     Returns:
         True if valid, False otherwise
     """
-    try:
-        datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
-        return True
-    except ValueError:
+    if len(dt_string) > _ISO_MAX_LENGTH or not _ISO_RE.match(dt_string):
         return False
+    
+    return _safe_parse(dt_string) is not None
 
-def convert_to_utc(dt_string: str, from_timezone: str = "UTC") -> str:
+def convert_to_utc(dt_string: DateTimeLike, from_timezone: str = "UTC") -> str:
     """
     Convert datetime string from given timezone to UTC.
     
     Args:
-        dt_string: Datetime string to convert
+        dt_string: Datetime string or parsed datetime to convert
         from_timezone: Source timezone
         
     Returns:
         UTC datetime string
     """
-    try:
-        # Parse datetime
-        dt = datetime.fromisoformat(dt_string)
-        
-        # Add timezone info if not present
-        if dt.tzinfo is None:
-            source_tz = pytz.timezone(from_timezone)
-            dt = source_tz.localize(dt)
-        
-        # Convert to UTC
-        utc_dt = dt.astimezone(pytz.UTC)
-        
-        return utc_dt.strftime("%Y-%m-%dT%H:%M:%S")
-        
-    except Exception as e:
-        logger.error(f"Error converting to UTC: {e}")
-        return dt_string
+    # Parse datetime
+    dt = _safe_parse(dt_string)
+    if dt is None:
+        logger.error("Error converting to UTC: invalid value %r", dt_string)
+        return str(dt_string)
+    
+    # Add timezone info if not present
+    if dt.tzinfo is None:
+        try:
+            dt = dt.replace(tzinfo=_get_tz(from_timezone))
+        except (ValueError, ZoneInfoNotFoundError) as e:
+            logger.error("Error converting to UTC: %s", e)
+            return str(dt_string)
+    
+    # Convert to UTC
+    utc_dt = dt.astimezone(_UTC)
+    
+    # Naive ISO string without fractional seconds or a "+00:00" suffix
+    return utc_dt.replace(tzinfo=None).isoformat(timespec='seconds')
 
-def calculate_duration_minutes(start_datetime: str, end_datetime: str) -> int:
+def calculate_duration_minutes(start_datetime: DateTimeLike, end_datetime: DateTimeLike) -> int:
     """
     Calculate duration between two datetime strings in minutes.
     
     Args:
-        start_datetime: Start datetime string
-        end_datetime: End datetime string
+        start_datetime: Start datetime string or parsed datetime
+        end_datetime: End datetime string or parsed datetime
         
     Returns:
         Duration in minutes
     """
+    start = _safe_parse(start_datetime)
+    end = _safe_parse(end_datetime)
+    if start is None or end is None:
+        logger.error("Error calculating duration: invalid value in %r - %r", start_datetime, end_datetime)
+        return 0
+    
     try:
-        start = datetime.fromisoformat(start_datetime)
-        end = datetime.fromisoformat(end_datetime)
-        
-        duration = end - start
-        return int(duration.total_seconds() / 60)
-        
-    except Exception as e:
-        logger.error(f"Error calculating duration: {e}")
+        # Integer timedelta division; any leftover seconds are discarded
+        return (end - start) // _ONE_MINUTE
+    except TypeError as e:
+        # Mixing naive and timezone-aware values
+        logger.error("Error calculating duration: %s", e)
         return 0
 
+_get_title = itemgetter('title')
+
+@functools.lru_cache(maxsize=1024)
+def _format_single_conflict(title: str, start: str, end: str) -> str:
+    """Build the single-conflict message, reused when the same event recurs."""
+    return f"Conflict with '{title}' ({start} - {end})"
+
 def format_conflict_message(conflicts: list) -> str:
     """
     Format conflict list into a readable message.
@@ -139,12 +343,12 @@ def format_conflict_message(conflicts: list) -> str:
     Returns:
         Formatted conflict message
     """
-    if not conflicts:
+    count = len(conflicts)
+    if not count:
         return "No conflicts detected."
     
-    if len(conflicts) == 1:
+    if count == 1:
         conflict = conflicts[0]
-        return f"Conflict with '{conflict['title']}' ({conflict['start_datetime']} - {conflict['end_datetime']})"
+        return _format_single_conflict(conflict['title'], conflict['start_datetime'], conflict['end_datetime'])
     
-    conflict_titles = [c['title'] for c in conflicts]
-    return f"Conflicts with {len(conflicts)} events: {', '.join(conflict_titles)}" 
\ No newline at end of file
+    return f"Conflicts with {count} events: {', '.join(map(_get_title, conflicts))}" 
\ No newline at end of file
@@ -0,0 +1,68 @@
+import unittest
+from datetime import datetime
+
+from app.fast_parser import FAST_PATH_THRESHOLD, try_fast_parse
+
+# Thursday morning
+NOW = datetime(2026, 10, 15, 9, 0)
+
+class FastParserTest(unittest.TestCase):
+    def assertParsed(self, user_input, title, start, now=NOW):
+        event, confidence = try_fast_parse(user_input, now)
+        self.assertIsNotNone(event, user_input)
+        self.assertGreaterEqual(confidence, FAST_PATH_THRESHOLD, user_input)
+        self.assertEqual(event["title"], title)
+        self.assertEqual(event["start_datetime"], start)
+    
+    def assertDeferred(self, user_input, now=NOW):
+        """The phrasing must be left to the LLM."""
+        event, confidence = try_fast_parse(user_input, now)
+        self.assertLess(confidence, FAST_PATH_THRESHOLD, user_input)
+    
+    def test_regular_phrasings(self):
+        self.assertParsed("Lunch with Sam tomorrow at noon", "Lunch with Sam", "2026-10-16T12:00:00")
+        self.assertParsed("Dentist on Friday at 4pm", "Dentist", "2026-10-16T16:00:00")
+        self.assertParsed("Standup today at 9:30am", "Standup", "2026-10-15T09:30:00")
+        self.assertParsed("Gym at 18:00", "Gym", "2026-10-15T18:00:00")
+    
+    def test_bare_weekday_is_next_occurrence(self):
+        self.assertParsed("Review Thursday at 2pm", "Review", "2026-10-22T14:00:00")
+    
+    def test_duration(self):
+        event, _ = try_fast_parse("Call with Ana tomorrow at 3pm for 30 minutes", NOW)
+        self.assertEqual(event["end_datetime"], "2026-10-16T15:30:00")
+    
+    def test_calendar_dates_are_deferred(self):
+        self.assertDeferred("Dentist December 3rd at 4pm")
+        self.assertDeferred("Team sync Jan 5th at 10am")
+        self.assertDeferred("Review on the 20th at 2pm")
+        self.assertDeferred("Dinner 12/3 at 7pm")
+    
+    def test_relative_offsets_are_deferred(self):
+        self.assertDeferred("Meeting in two weeks at 3pm")
+        self.assertDeferred("Meeting in 3 days at 3pm")
+        self.assertDeferred("Lunch next Friday at noon")
+    
+    def test_unrecognized_day_words_are_deferred(self):
+        self.assertDeferred("call mom tmrw at 5pm")
+        self.assertDeferred("Gym sat at 10am")
+        self.assertDeferred("Brunch on the weekend at 11am")
+    
+    def test_timezones_are_deferred(self):
+        self.assertDeferred("Meeting at 3pm PST")
+        self.assertDeferred("Call at 10:00 UTC")
+        self.assertDeferred("Sync at 9am Eastern")
+    
+    def test_ranges_and_decimals_are_deferred(self):
+        self.assertDeferred("Workshop 4-5pm")
+        self.assertDeferred("Lunch 12-1pm tomorrow")
+        self.assertDeferred("Call at 1.5pm")
+    
+    def test_past_time_today_is_deferred(self):
+        evening = datetime(2026, 10, 15, 18, 0)
+        self.assertDeferred("Standup today at 9am", evening)
+        self.assertDeferred("Standup at 9am", evening)
+        self.assertParsed("Standup tomorrow at 9am", "Standup", "2026-10-16T09:00:00", evening)
+
+if __name__ == "__main__":
+    unittest.main()